@@ -1,4 +1,3 @@
 #!/bin/zsh
 
-python3 src/main.py
-cd public && python3 -m http.server 8888
+python3 src/main.py --copy-strategy hardlink --serve 8888
@@ -0,0 +1,232 @@
+from os import path as path
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from htmlnode import LeafNode, ParentNode
+
+SITEMAP = "sitemap.xml"
+FEED = "feed.xml"
+# posts listed on every page of a section index
+PAGE_SIZE = 10
+# newest posts in the feed
+FEED_SIZE = 20
+
+
+def page_summary(doc):
+    # what the aggregates need from a page, kept in the build manifest so
+    # unchanged pages aren't parsed again to list them
+    return {
+        "title": doc.title,
+        "date": doc.metadata.get("date"),
+        "description": doc.metadata.get("description", ""),
+    }
+
+
+def listed_page(summary, mtime_ns=None):
+    # a summary as the aggregates use it, "date" is the front matter date
+    # and "modified" the date of the source mtime, only for the sitemap
+    return {**summary, "date": page_date(summary), "modified": mtime_date(mtime_ns)}
+
+
+def page_date(summary):
+    date = summary.get("date")
+    if not date:
+        return None
+    try:
+        return datetime.fromisoformat(date).date().isoformat()
+    except ValueError:
+        print(f"Warning: {summary.get('title')} has an invalid date: {date}")
+        return None
+
+
+def mtime_date(mtime_ns):
+    if mtime_ns is None:
+        return None
+    return datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc).date().isoformat()
+
+
+def sort_posts(posts):
+    # newest first by the front matter date, posts without one after them
+    # by title. never by the mtime, a checkout or touch would reorder them
+    posts.sort(key=lambda post: (post[1]["title"] or "", post[0]))
+    posts.sort(key=lambda post: post[1]["date"] or "", reverse=True)
+
+
+def page_url(name):
+    # blog/a/index.html -> /blog/a/
+    if name == "index.html" or name.endswith("/index.html"):
+        return "/" + name[: -len("index.html")]
+    return "/" + name
+
+
+def section_of(name):
+    # the directory listing the page, "" for pages on the top level
+    url = page_url(name).rstrip("/")
+    return url[1:].rpartition("/")[0]
+
+
+def section_page_name(section, number):
+    if number == 1:
+        return f"{section}/index.html"
+    return f"{section}/page/{number}/index.html"
+
+
+def section_of_index(name):
+    # the section a section index page lists, blog/page/2/index.html -> blog
+    match = re.fullmatch(r"(.+?)(?:/page/\d+)?/index\.html", name)
+    return match.group(1) if match else None
+
+
+def sections(pages):
+    # directories of pages without an index page of their own, a hand
+    # written index.md wins over the generated listing
+    found = {}
+    for name, summary in pages.items():
+        section = section_of(name)
+        if section:
+            found.setdefault(section, []).append((name, summary))
+    for section in [s for s in found if section_page_name(s, 1) in pages]:
+        del found[section]
+    for posts in found.values():
+        sort_posts(posts)
+    return found
+
+
+def section_node(section, posts, number, count):
+    # built as nodes, titles are text and never parsed as markdown again
+    title = section.rpartition("/")[2].replace("-", " ").capitalize()
+    items = []
+    for name, summary in posts:
+        children = [LeafNode("a", escape(summary["title"]), {"href": page_url(name)})]
+        if summary["date"]:
+            children.append(LeafNode(None, f" ({summary['date']})"))
+        items.append(ParentNode("li", children))
+    children = [LeafNode("h1", escape(title)), ParentNode("ul", items)]
+    links = []
+    if number > 1:
+        newer = page_url(section_page_name(section, number - 1))
+        links.append(LeafNode("a", "Newer posts", {"href": newer}))
+    if number < count:
+        if links:
+            links.append(LeafNode(None, " "))
+        older = page_url(section_page_name(section, number + 1))
+        links.append(LeafNode("a", "Older posts", {"href": older}))
+    if links:
+        children.append(ParentNode("p", links))
+    return title, ParentNode("div", children)
+
+
+def render_sections(pages, template, partials=None, only=None):
+    # {output name: html} for every page of every section index, or just
+    # the one named only
+    outputs = {}
+    for section, posts in sorted(sections(pages).items()):
+        count = (len(posts) + PAGE_SIZE - 1) // PAGE_SIZE
+        for number in range(1, count + 1):
+            name = section_page_name(section, number)
+            if only is not None and name != only:
+                continue
+            chunk = posts[(number - 1) * PAGE_SIZE : number * PAGE_SIZE]
+            title, node = section_node(section, chunk, number, count)
+            values = {"Title": title, "Content": node}
+            outputs[name] = template.render(values, partials)
+    return outputs
+
+
+def absolute_url(site_url, basepath, name):
+    return site_url.rstrip("/") + basepath.rstrip("/") + page_url(name)
+
+
+def render_sitemap(pages, site_url, basepath="/"):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for name, summary in sorted(pages.items()):
+        url = escape(absolute_url(site_url, basepath, name))
+        lines.append(f"<url><loc>{url}</loc>")
+        modified = summary.get("modified") or summary.get("date")
+        if modified:
+            lines.append(f"<lastmod>{modified}</lastmod>")
+        lines.append("</url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def render_feed(pages, site_url, basepath="/"):
+    # rss 2.0 of the newest posts across all sections
+    posts = [post for posts in sections(pages).values() for post in posts]
+    sort_posts(posts)
+    home = pages.get("index.html", {})
+    title = escape(home.get("title") or site_url)
+    link = escape(absolute_url(site_url, basepath, "index.html"))
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0"><channel>',
+        f"<title>{title}</title><link>{link}</link>",
+        f"<description>{escape(home.get('description') or title)}</description>",
+    ]
+    for name, summary in posts[:FEED_SIZE]:
+        url = escape(absolute_url(site_url, basepath, name))
+        lines.append(f"<item><title>{escape(summary['title'] or '')}</title>")
+        lines.append(f"<link>{url}</link><guid>{url}</guid>")
+        if summary["date"]:
+            date = datetime.fromisoformat(summary["date"]).replace(tzinfo=timezone.utc)
+            lines.append(f"<pubDate>{format_datetime(date)}</pubDate>")
+        if summary.get("description"):
+            lines.append(f"<description>{escape(summary['description'])}</description>")
+        lines.append("</item>")
+    lines.append("</channel></rss>")
+    return "\n".join(lines) + "\n"
+
+
+def render_aggregates(pages, template, basepath="/", site_url=None, partials=None):
+    # pages is {output name: summary with a date}, returns {output name: str}
+    outputs = render_sections(pages, template, partials)
+    if site_url:
+        listed = dict(pages)
+        listed.update((name, {"date": None}) for name in outputs)
+        outputs[SITEMAP] = render_sitemap(listed, site_url, basepath)
+        outputs[FEED] = render_feed(pages, site_url, basepath)
+    return outputs
+
+
+def manifest_pages(manifest, dest_dir_path):
+    # the summaries recorded by the last builds, by output name
+    dest_dir_path = path.abspath(dest_dir_path)
+    pages = {}
+    for key, entry in manifest.pages.items():
+        summary = entry.get("summary")
+        if summary is None:
+            continue
+        name = path.relpath(path.join(manifest.root, key), dest_dir_path)
+        pages[name.replace(os.sep, "/")] = listed_page(summary, entry["mtime"])
+    return pages
+
+
+def write_aggregates(
+    manifest, dest_dir_path, template, basepath="/", site_url=None, partials=None
+):
+    # only outputs whose content changed are written, the ones no longer
+    # generated are removed. returns the paths written and removed
+    outputs = render_aggregates(
+        manifest_pages(manifest, dest_dir_path), template, basepath, site_url, partials
+    )
+    written = []
+    generated = []
+    for name, text in outputs.items():
+        file_path = path.join(dest_dir_path, *name.split("/"))
+        generated.append(manifest.key(file_path))
+        data = text.encode()
+        try:
+            with open(file_path, "rb") as f:
+                if f.read() == data:
+                    continue
+        except FileNotFoundError:
+            os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        written.append(file_path)
+    return written + manifest.set_generated(generated, dest_dir_path)
@@ -0,0 +1,56 @@
+from os import path as path
+import hashlib
+import json
+from manifest import file_digest
+from site_index import scan
+
+ASSET_MANIFEST = "asset-manifest.json"
+HASH_LENGTH = 8
+
+
+def fingerprinted_name(name, digest):
+    # images/a.png -> images/a.3f9a1c2e.png
+    root, ext = path.splitext(name)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+
+class AssetManifest:
+    def __init__(self, names=None):
+        # static file -> fingerprinted name, both relative with "/"
+        self.names = names if names is not None else {}
+        self.digest = hashlib.sha1(
+            json.dumps(self.names, sort_keys=True).encode()
+        ).hexdigest()
+
+    @classmethod
+    def build(cls, static_dir, hashes, files=None):
+        # hashes is the build manifest's {name: [mtime, size, hash]}, files
+        # keeping their mtime and size aren't read again. files is the site
+        # index of static_dir, scanned here when not given
+        names = {}
+        for f in files if files is not None else scan(static_dir):
+            cached = hashes.get(f.name)
+            if cached and cached[:2] == [f.mtime_ns, f.size]:
+                digest = cached[2]
+            else:
+                digest = file_digest(f.source)
+                hashes[f.name] = [f.mtime_ns, f.size, digest]
+            names[f.name] = fingerprinted_name(f.name, digest)
+        for name in [n for n in hashes if n not in names]:
+            del hashes[name]
+        return cls(names)
+
+    def url(self, name):
+        return self.names.get(name, name)
+
+    def save(self, dest_dir_path):
+        manifest_path = path.join(dest_dir_path, ASSET_MANIFEST)
+        with open(manifest_path, "w") as f:
+            json.dump(self.names, f, indent=1, sort_keys=True)
+        return manifest_path
+
+    def __eq__(self, other):
+        return isinstance(other, AssetManifest) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
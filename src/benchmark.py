@@ -0,0 +1,368 @@
+from os import path as path
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import block_cache
+import images
+import main as cli
+import partials
+import template
+from htmlnode import LeafNode, ParentNode
+from markdown_block import (
+    markdown_to_html_node,
+    markdown_to_blocks,
+    block_to_block_type,
+    BlockType,
+)
+from utils import find_pages, write_page
+from inline_markdown import (
+    text_to_text_nodes,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+)
+from textnode import TextNode, TextType
+
+SHAPES = ("mixed", "paragraphs", "links", "lists", "code")
+TEMPLATE_PATH = path.join(path.dirname(path.abspath(__file__)), "..", "template.html")
+PAGES_PER_SECTION = 100
+
+
+def chained_text_to_text_nodes(text):
+    # the five pass implementation text_to_text_nodes used to have
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def link_heavy_paragraph(links):
+    parts = ["Some **bold** text to start with. "]
+    for i in range(links):
+        parts.append(f"See [link {i}](https://example.com/{i}) and ")
+        if i % 10 == 0:
+            parts.append(f"![image {i}](/images/{i}.png) ")
+    return "".join(parts)
+
+
+def synthetic_page(i, shape="mixed", size=1):
+    body = [f"# Page {i}", "[< Back Home](/)"]
+    for n in range(size):
+        body.append(SHAPE_SECTIONS[shape](i, n))
+    return "\n\n".join(body) + "\n"
+
+
+def mixed_section(i, n):
+    return f"""## Section {n}
+
+[< Back Home](/)
+
+![Cover {i}](/images/{i}.png)
+
+This is paragraph **{i}** with _italic_ text, `inline code` and a
+[link to the next page](/pages/{i + 1}) that wraps onto a second line.
+
+> A quote about page {i}
+> spanning two lines
+
+- first item with [a link](https://example.com/{i})
+- second item with **bold**
+- third item
+
+1. one
+2. two
+
+```
+print("page {i}")
+```"""
+
+
+def paragraphs_section(i, n):
+    sentence = (
+        f"Sentence {n} of page {i} has **bold words**, some _italic_ words "
+        "and plain text that keeps going for a while"
+    )
+    return "\n".join(f"{sentence} on line {line}." for line in range(20))
+
+
+def links_section(i, n):
+    return link_heavy_paragraph(50)
+
+
+def lists_section(i, n):
+    items = [f"- item {k} with [a link](/pages/{k}) and `code`" for k in range(20)]
+    ordered = [f"{k + 1}. ordered **item** {k}" for k in range(20)]
+    return "\n".join(items) + "\n\n" + "\n".join(ordered)
+
+
+def code_section(i, n):
+    lines = [f"    value_{k} = compute({k}, page={i})" for k in range(100)]
+    return "```\ndef section_{n}():\n" + "\n".join(lines) + "\n```"
+
+
+SHAPE_SECTIONS = {
+    "mixed": mixed_section,
+    "paragraphs": paragraphs_section,
+    "links": links_section,
+    "lists": lists_section,
+    "code": code_section,
+}
+
+
+def write_corpus(root, pages, shape="mixed", size=1):
+    for i in range(pages):
+        section = f"section-{i // PAGES_PER_SECTION}"
+        page_dir = path.join(root, "content", section, f"page-{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(path.join(page_dir, "index.md"), "w") as f:
+            f.write(synthetic_page(i, shape, size))
+    os.makedirs(path.join(root, "static", "images"), exist_ok=True)
+    with open(path.join(root, "static", "index.css"), "w") as f:
+        f.write("body { margin: 0; }\n")
+    for i in range(10):
+        with open(path.join(root, "static", "images", f"{i}.png"), "wb") as f:
+            f.write(os.urandom(64 * 1024))
+    shutil.copy(TEMPLATE_PATH, path.join(root, "template.html"))
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, ParentNode):
+            stack.extend(node.children)
+    return count
+
+
+def instance_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def bench_memory(args):
+    pages = [synthetic_page(i) for i in range(args.pages)]
+    tracemalloc.start()
+    trees = [markdown_to_html_node(md) for md in pages]
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = sum(count_nodes(tree) for tree in trees)
+    text_node = TextNode("text", TextType.TEXT)
+    print(f"pages:                  {len(trees)}")
+    print(f"html nodes:             {nodes}")
+    print(f"bytes per node (heap):  {allocated / nodes:.1f}")
+    print(f"LeafNode instance:      {instance_size(LeafNode('b', 'text'))} bytes")
+    print(f"ParentNode instance:    {instance_size(ParentNode('p', []))} bytes")
+    print(f"TextNode instance:      {instance_size(text_node)} bytes")
+    print(f"traced peak:            {peak / 2**20:.1f} MiB")
+    # ru_maxrss is reported in KiB on Linux
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"peak RSS:               {rss / 1024:.1f} MiB")
+
+
+def reset_state():
+    # the caches a build leaves in the process, every repeat starts cold
+    block_cache.disable()
+    images.use(None)
+    template._cache.clear()
+    partials._rendered.clear()
+
+
+def run_site_build(root, jobs):
+    cwd = os.getcwd()
+    argv = sys.argv
+    reset_state()
+    try:
+        os.chdir(root)
+        sys.argv = ["main.py", "--clean", "--no-cache", "--jobs", str(jobs)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            cli.main()
+    finally:
+        sys.argv = argv
+        os.chdir(cwd)
+
+
+def measure(func, repeat, trace_memory=True):
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_pipeline(args):
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        write_corpus(root, args.pages, args.shape, args.size)
+        results = pipeline_stages(root, args)
+    finally:
+        shutil.rmtree(root)
+
+    report = {
+        "corpus": {"pages": args.pages, "shape": args.shape, "size": args.size},
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "stages": results,
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare_to_baseline(results, baseline["stages"], args.threshold):
+            sys.exit(1)
+
+
+def pipeline_stages(root, args):
+    content = path.join(root, "content")
+    template_path = path.join(root, "template.html")
+    pages = find_pages(content, path.join(root, "docs"))
+    docs = []
+    for source, _ in pages:
+        with open(source) as f:
+            docs.append(f.read())
+    blocks = [b for md in docs for b in markdown_to_blocks(md)]
+    paragraphs = [
+        " ".join(b.splitlines())
+        for b in blocks
+        if block_to_block_type(b) == BlockType.PARAGRAPH
+    ]
+    trees = [markdown_to_html_node(md) for md in docs]
+
+    def generate_pages():
+        for source, dest in pages:
+            write_page("/", source, template_path, dest)
+
+    stages = {
+        "markdown_to_blocks": lambda: [markdown_to_blocks(md) for md in docs],
+        "block_to_block_type": lambda: [block_to_block_type(b) for b in blocks],
+        "text_to_text_nodes": lambda: [text_to_text_nodes(p) for p in paragraphs],
+        "markdown_to_html_node": lambda: [markdown_to_html_node(md) for md in docs],
+        "to_html": lambda: [tree.to_html() for tree in trees],
+        "generate_page": generate_pages,
+        "build": lambda: run_site_build(root, args.jobs),
+    }
+    input_mb = sum(len(md.encode()) for md in docs) / 2**20
+    results = {}
+    for name, func in stages.items():
+        if args.stages and name not in args.stages:
+            continue
+        # tracing a multi-process build would only see the parent
+        seconds, peak = measure(func, args.repeat, trace_memory=name != "build")
+        results[name] = {
+            "seconds": seconds,
+            "pages_per_sec": len(docs) / seconds,
+            "mb_per_sec": input_mb / seconds,
+            "peak_bytes": peak,
+        }
+        print(f"{name:<22} {seconds * 1000:>10.1f} ms", file=sys.stderr)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold):
+    regressed = False
+    print(f"{'stage':<22} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["seconds"]
+        change = result["seconds"] / before - 1
+        flag = ""
+        if change > threshold:
+            regressed = True
+            flag = "  REGRESSION"
+        print(
+            f"{name:<22} {before * 1000:>12.1f} {result['seconds'] * 1000:>12.1f} "
+            f"{change:>+8.1%}{flag}"
+        )
+    return regressed
+
+
+def best_of(func, arg, repeat, number=1):
+    timings = timeit.repeat(lambda: func(arg), number=number, repeat=repeat)
+    return min(timings) / number
+
+
+def bench_inline(args):
+    print(f"{'links':>8} {'chained ms':>12} {'single ms':>12} {'speedup':>8}")
+    for links in args.links:
+        text = link_heavy_paragraph(links)
+        if chained_text_to_text_nodes(text) != text_to_text_nodes(text):
+            raise Exception(f"tokenizers disagree on {links} links")
+        number = max(1, 1000 // links)
+        chained = best_of(chained_text_to_text_nodes, text, args.repeat, number)
+        single = best_of(text_to_text_nodes, text, args.repeat, number)
+        print(
+            f"{links:>8} {chained * 1000:>12.2f} {single * 1000:>12.2f} "
+            f"{chained / single:>7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    inline = commands.add_parser("inline", help="inline tokenizer on link heavy text")
+    inline.add_argument(
+        "--links", type=int, nargs="+", default=[10, 100, 1000, 5000]
+    )
+    inline.add_argument("--repeat", type=int, default=5)
+    inline.set_defaults(run=bench_inline)
+
+    memory = commands.add_parser("memory", help="node memory on a large corpus")
+    memory.add_argument("--pages", type=int, default=20000)
+    memory.set_defaults(run=bench_memory)
+
+    pipeline = commands.add_parser(
+        "pipeline", help="time every stage on a synthetic corpus, report JSON"
+    )
+    pipeline.add_argument("--pages", type=int, default=1000)
+    pipeline.add_argument("--shape", choices=SHAPES, default="mixed")
+    pipeline.add_argument(
+        "--size", type=int, default=1, help="sections per synthetic page"
+    )
+    pipeline.add_argument("--repeat", type=int, default=3)
+    pipeline.add_argument("--jobs", type=int, default=1)
+    pipeline.add_argument("--stages", nargs="+", help="only run these stages")
+    pipeline.add_argument("--output", help="write the JSON report to this file")
+    pipeline.add_argument("--baseline", help="JSON report to compare against")
+    pipeline.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown ratio that counts as a regression (default: 0.1)",
+    )
+    pipeline.set_defaults(run=bench_pipeline)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
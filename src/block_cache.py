@@ -0,0 +1,119 @@
+from os import path as path
+import hashlib
+import os
+import pickle
+import shutil
+from collections import OrderedDict
+
+# bump whenever block rendering changes, old entries then stop matching
+RENDERER_VERSION = "1"
+CACHE_FILE = "blocks.pickle"
+
+# cache of the current process, None when caching is off
+_active = None
+
+
+class BlockCache:
+    def __init__(self, cache_dir=None, max_entries=100_000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        # key -> (html, block summary), least recently used first
+        self.entries = OrderedDict()
+        self.new_entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, cache_dir, max_entries=100_000):
+        cache = cls(cache_dir, max_entries)
+        try:
+            with open(path.join(cache_dir, CACHE_FILE), "rb") as f:
+                version, entries = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return cache
+        if version == RENDERER_VERSION:
+            cache.entries = entries
+            cache.evict()
+        return cache
+
+    def save(self):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = path.join(self.cache_dir, CACHE_FILE)
+        with open(cache_path + ".tmp", "wb") as f:
+            pickle.dump(
+                (RENDERER_VERSION, self.entries), f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(cache_path + ".tmp", cache_path)
+
+    def clear(self):
+        self.entries.clear()
+        self.new_entries.clear()
+        if self.cache_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    @staticmethod
+    def key(block, salt=""):
+        # salt is whatever else the rendered html depends on
+        text = f"{RENDERER_VERSION}\0{block}"
+        if salt:
+            text += f"\0{salt}"
+        return hashlib.sha1(text.encode()).digest()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.new_entries[key] = value
+        self.evict()
+
+    def evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def drain(self):
+        # what this process learned since the last drain, see merge()
+        delta = (self.new_entries, self.hits, self.misses)
+        self.new_entries = {}
+        self.hits = 0
+        self.misses = 0
+        return delta
+
+    def merge(self, delta):
+        new_entries, hits, misses = delta
+        for key, value in new_entries.items():
+            self.put(key, value)
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        return (
+            f"Block cache: {self.hits} hits, {self.misses} misses "
+            f"({rate:.0%} hit rate), {len(self.entries)} entries"
+        )
+
+
+def use(cache_dir, max_entries=100_000):
+    global _active
+    if _active is None or _active.cache_dir != cache_dir:
+        _active = BlockCache.load(cache_dir, max_entries)
+    return _active
+
+
+def active():
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
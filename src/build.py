@@ -0,0 +1,185 @@
+from os import path as path
+import hashlib
+import io
+import json
+import os
+import struct
+import tarfile
+import time
+import zipfile
+import images
+from aggregates import listed_page, page_summary, render_aggregates
+from assets import ASSET_MANIFEST, AssetManifest, fingerprinted_name
+from images import IMAGE_EXTENSIONS, ImageSizes, read_image_size
+from partials import Partials
+from site_index import IGNORE_PATTERNS, output_path, page_output, scan
+from template import Template
+from utils import parse_document, warn_missing_images
+
+
+class DictSource:
+    # files held in memory, {name: str or bytes} with "/" separated names
+    def __init__(self, files):
+        self.files = files
+
+    def names(self):
+        return sorted(self.files)
+
+    def read(self, name):
+        data = self.files[name]
+        return data.encode() if isinstance(data, str) else data
+
+    def mtime_ns(self, name):
+        return None
+
+
+class DirSource:
+    def __init__(self, root, ignore=IGNORE_PATTERNS):
+        self.root = path.abspath(root)
+        self.ignore = ignore
+
+    def names(self):
+        return [f.name for f in scan(self.root, self.ignore)]
+
+    def read(self, name):
+        with open(output_path(self.root, name), "rb") as f:
+            return f.read()
+
+    def mtime_ns(self, name):
+        return os.stat(output_path(self.root, name)).st_mtime_ns
+
+
+class Sink:
+    def write(self, name, data):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DictSink(Sink):
+    def __init__(self):
+        # output name -> bytes
+        self.files = {}
+
+    def write(self, name, data):
+        self.files[name] = data
+
+
+class DirSink(Sink):
+    def __init__(self, root):
+        self.root = path.abspath(root)
+
+    def write(self, name, data):
+        file_path = output_path(self.root, name)
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+
+class TarSink(Sink):
+    def __init__(self, archive_path):
+        mode = "w:gz" if archive_path.endswith((".tar.gz", ".tgz")) else "w"
+        self.archive = tarfile.open(archive_path, mode)
+        self.mtime = time.time()
+
+    def write(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = self.mtime
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+class ZipSink(Sink):
+    def __init__(self, archive_path):
+        self.archive = zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED)
+
+    def write(self, name, data):
+        self.archive.writestr(name, data)
+
+    def close(self):
+        self.archive.close()
+
+
+def open_sink(output):
+    # a sink for a directory or an archive path, picked by its extension
+    if output.endswith((".tar", ".tar.gz", ".tgz")):
+        return TarSink(output)
+    if output.endswith(".zip"):
+        return ZipSink(output)
+    return DirSink(output)
+
+
+def build(
+    content,
+    template,
+    static=None,
+    sink=None,
+    basepath="/",
+    partials=None,
+    minify=False,
+    fingerprint=False,
+    site_url=None,
+):
+    # builds the site from sources without touching the disk on its own,
+    # content, static and partials are sources, template the template html.
+    # returns {output name: bytes} without a sink, the sink otherwise
+    result = sink if sink is not None else DictSink()
+
+    names = {}
+    sizes = {}
+    for name in static.names() if static else []:
+        data = static.read(name)
+        if fingerprint:
+            names[name] = fingerprinted_name(name, hashlib.sha256(data).hexdigest())
+        result.write(names.get(name, name), data)
+        if path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+            try:
+                sizes[name] = read_image_size(io.BytesIO(data))
+            except (ValueError, struct.error) as e:
+                print(f"Warning: can't read the size of {name}: {e}")
+    assets = AssetManifest(names) if fingerprint else None
+    if assets:
+        manifest = json.dumps(assets.names, indent=1, sort_keys=True)
+        result.write(ASSET_MANIFEST, manifest.encode())
+    image_sizes = ImageSizes(sizes)
+
+    if partials is not None:
+        partials = Partials.from_files(
+            {name: partials.read(name).decode() for name in partials.names()}
+        )
+    page = Template(template, basepath, minify, assets)
+    summaries = {}
+    previous = images.active()
+    images.use(image_sizes)
+    try:
+        for name in content.names():
+            if not name.endswith(".md"):
+                continue
+            try:
+                doc, values = parse_document(
+                    name, content.read(name).decode(), partials
+                )
+                html = page.render(values, partials)
+            except Exception as e:
+                raise Exception(f"Failed to generate page from {name}: {e}") from e
+            warn_missing_images(name, doc, image_sizes)
+            result.write(page_output(name), html.encode())
+            summaries[page_output(name)] = listed_page(
+                page_summary(doc), content.mtime_ns(name)
+            )
+    finally:
+        images.use(previous)
+    outputs = render_aggregates(summaries, page, basepath, site_url, partials)
+    for name, text in outputs.items():
+        result.write(name, text.encode())
+    return result.files if sink is None else sink
@@ -0,0 +1,109 @@
+from os import path as path
+import gzip
+import os
+from utils import map_tasks
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = frozenset(
+    {".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map"}
+)
+COMPRESSED_SUFFIXES = (".gz", ".br")
+MIN_SIZE = 256
+# keep a sibling only when it is at most this fraction of the original
+MAX_RATIO = 0.9
+
+
+def encodings():
+    return (".gz", ".br") if brotli else (".gz",)
+
+
+def compress(data, suffix):
+    if suffix == ".gz":
+        # mtime=0 keeps the output identical between builds
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def is_compressible(file_path):
+    return path.splitext(file_path)[1] in COMPRESSIBLE_EXTENSIONS
+
+
+def compress_file(task):
+    file_path, suffixes = task
+    st = os.stat(file_path)
+    written = []
+    saved = 0
+    data = None
+    for suffix in suffixes:
+        sibling = file_path + suffix
+        # below this the response headers outweigh what compression saves
+        if st.st_size < MIN_SIZE:
+            if path.exists(sibling):
+                os.remove(sibling)
+            continue
+        try:
+            # siblings carry the mtime of the file they were made from
+            if os.stat(sibling).st_mtime_ns == st.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        compressed = compress(data, suffix)
+        if len(compressed) > st.st_size * MAX_RATIO:
+            if path.exists(sibling):
+                os.remove(sibling)
+            continue
+        with open(sibling + ".tmp", "wb") as f:
+            f.write(compressed)
+        os.utime(sibling + ".tmp", ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(sibling + ".tmp", sibling)
+        written.append(suffix)
+        saved += st.st_size - len(compressed)
+    return file_path, written, saved
+
+
+def remove_siblings(file_path):
+    # returns whether there were any
+    removed = False
+    for suffix in COMPRESSED_SUFFIXES:
+        if path.exists(file_path + suffix):
+            os.remove(file_path + suffix)
+            removed = True
+    return removed
+
+
+def compress_outputs(dest_dir_path, jobs=1):
+    suffixes = encodings()
+    files = []
+    removed = 0
+    for dir_path, _, names in os.walk(dest_dir_path):
+        for name in names:
+            file_path = path.join(dir_path, name)
+            base, ext = path.splitext(file_path)
+            if ext in COMPRESSED_SUFFIXES:
+                # the file it was made from is gone
+                if not path.exists(base):
+                    os.remove(file_path)
+                    removed += 1
+            elif is_compressible(file_path):
+                files.append(file_path)
+
+    tasks = [(f, suffixes) for f in files]
+    compressed = 0
+    saved = 0
+    for _, written, file_saved in map_tasks(compress_file, tasks, jobs):
+        compressed += bool(written)
+        saved += file_saved
+    print(
+        f"Compressed {compressed} files to {', '.join(suffixes)}, "
+        f"{len(files) - compressed} unchanged or skipped, {removed} removed, "
+        f"{saved / 1024:.1f} KiB saved"
+    )
+    if brotli is None:
+        print("  install brotli to also write .br files")
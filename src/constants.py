@@ -1,2 +1,18 @@
 IMAGES_REGEX = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
 LINK_REGEX = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
+INLINE_REGEX = (
+    r"(?=[*_`!\[])"  # lets the scanner skip plain text quickly
+    r"(?:\*\*(.*?)\*\*"
+    r"|_(.*?)_"
+    r"|`(.*?)`"
+    r"|!\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    r"|(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\))"
+)
+# {{ Name }} placeholders and {{> name }} includes
+PLACEHOLDER_REGEX = r"\{\{(>?) ([\w-]+) \}\}"
+INCLUDE_REGEX = r"\{\{> ([\w-]+) \}\}"
+# comments, declarations and tags, group 1 is "/" for closing tags, group 2
+# the tag name
+HTML_TOKEN_REGEX = r"<!--.*?-->|<![^>]*>|<(/?)([a-zA-Z][\w-]*)[^>]*>"
+# root relative urls in attributes, group 2 is the path without the "/"
+URL_REGEX = r'((?:href|src)=")/([^"?#]*)'
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+COPY_STRATEGIES = ("copy", "hardlink", "zerocopy", "reflink")
+# linux ioctl that shares the extents of one file with another (btrfs, xfs)
+FICLONE = 0x40049409
+# each strategy falls back to the next one when the filesystem refuses it
+FALLBACKS = {"hardlink": "copy", "reflink": "zerocopy", "zerocopy": "copy"}
+
+
+def copy_file(src, dst, strategy="copy"):
+    if strategy not in COPY_STRATEGIES:
+        raise ValueError(f"invalid copy strategy: {strategy}")
+    # never write through an existing hardlink into the source tree
+    if os.path.lexists(dst):
+        os.remove(dst)
+    while True:
+        try:
+            STRATEGIES[strategy](src, dst)
+            return strategy
+        except OSError:
+            if strategy not in FALLBACKS:
+                raise
+            strategy = FALLBACKS[strategy]
+
+
+def plain_copy(src, dst):
+    shutil.copy2(src, dst)
+
+
+def hardlink(src, dst):
+    os.link(src, dst)
+
+
+def zero_copy(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        offset = 0
+        while offset < size:
+            if hasattr(os, "copy_file_range"):
+                n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - offset)
+            else:
+                n = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+            if n == 0:
+                break
+            offset += n
+    shutil.copystat(src, dst)
+
+
+def reflink(src, dst):
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+STRATEGIES = {
+    "copy": plain_copy,
+    "hardlink": hardlink,
+    "zerocopy": zero_copy,
+    "reflink": reflink,
+}
@@ -0,0 +1,58 @@
+from textnode import TextType
+
+
+class Document:
+    def __init__(self, root, metadata=None):
+        self.root = root
+        self.metadata = metadata if metadata is not None else {}
+        self.title = None
+        # (level, text) for every heading in order
+        self.headings = []
+        # (text, url) pairs
+        self.links = []
+        # (alt, url) pairs
+        self.images = []
+        self.text_length = 0
+        # names of the partials included by the page
+        self.includes = []
+        # what minification took off the rendered page
+        self.bytes_saved = 0
+
+    def add_heading(self, level, text):
+        if level == 1 and self.title is None:
+            self.title = text.strip()
+        self.headings.append((level, text))
+        self.text_length += len(text)
+
+    def add_text_nodes(self, text_nodes):
+        for node in text_nodes:
+            match node.text_type:
+                case TextType.LINK:
+                    self.links.append((node.text, node.url))
+                case TextType.IMAGE:
+                    self.images.append((node.text, node.url))
+                    continue
+            self.text_length += len(node.text)
+
+    def add_code(self, code):
+        self.text_length += len(code)
+
+    def summary(self):
+        # what a single block contributed, see merge()
+        return (self.headings, self.links, self.images, self.text_length)
+
+    def merge(self, summary):
+        headings, links, images, text_length = summary
+        for level, text in headings:
+            if level == 1 and self.title is None:
+                self.title = text.strip()
+        self.headings.extend(headings)
+        self.links.extend(links)
+        self.images.extend(images)
+        self.text_length += text_length
+
+    def __repr__(self):
+        return (
+            f"Document({self.title}, {len(self.headings)} headings, "
+            f"{len(self.links)} links, {len(self.images)} images)"
+        )
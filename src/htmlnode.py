@@ -1,4 +1,6 @@
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag=None,
@@ -14,6 +16,30 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError()
 
+    def html_parts(self):
+        # opening html, children to render in between, closing html
+        raise NotImplementedError()
+
+    def iter_html(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if type(node) is str:
+                yield node
+                continue
+            head, children, tail = node.html_parts()
+            yield head
+            if children:
+                stack.append(tail)
+                stack.extend(reversed(children))
+            elif tail:
+                yield tail
+
+    def write_to(self, stream):
+        write = stream.append if isinstance(stream, list) else stream.write
+        for chunk in self.iter_html():
+            write(chunk)
+
     def props_to_html(self):
         if not self.props:
             return ""
@@ -41,6 +67,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag=tag, value=value, props=props)
 
@@ -51,18 +79,24 @@ class LeafNode(HTMLNode):
             return self.value
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def html_parts(self):
+        return self.to_html(), None, None
+
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, children=children, props=props)
 
     def to_html(self):
+        html = []
+        self.write_to(html)
+        return "".join(html)
+
+    def html_parts(self):
         if not self.tag:
             raise ValueError("all parent node must have a tag")
         if self.children is None:
             raise ValueError("all parent node must have children")
-        html = [f"<{self.tag}{self.props_to_html()}>"]
-        for child in self.children:
-            html.append(child.to_html())
-        html.append(f"</{self.tag}>")
-        return "".join(html)
+        return f"<{self.tag}{self.props_to_html()}>", self.children, f"</{self.tag}>"
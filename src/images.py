@@ -0,0 +1,133 @@
+from os import path as path
+import hashlib
+import json
+import os
+import struct
+from site_index import scan
+
+IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp"})
+# jpeg start of frame markers, the ones holding the image size
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# sizes used by the renderer of the current process, None when off
+_active = None
+
+
+def image_size(file_path):
+    # (width, height) read from the file header, pixels are never decoded
+    with open(file_path, "rb") as f:
+        return read_image_size(f)
+
+
+def read_image_size(f):
+    head = f.read(32)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return webp_size(head)
+    if head[:2] == b"\xff\xd8":
+        f.seek(2)
+        return jpeg_size(f)
+    raise ValueError("unknown image format")
+
+
+def webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        b0, b1, b2, b3 = head[21:25]
+        width = 1 + (b0 | (b1 & 0x3F) << 8)
+        height = 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+        return width, height
+    if chunk == b"VP8X":
+        width = 1 + int.from_bytes(head[24:27], "little")
+        height = 1 + int.from_bytes(head[27:30], "little")
+        return width, height
+    raise ValueError("unknown webp format")
+
+
+def jpeg_size(f):
+    # walk the segments up to the start of frame, skipping their payloads
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ValueError("jpeg without a frame header")
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        (length,) = struct.unpack(">H", f.read(2))
+        if marker[1] in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+class ImageSizes:
+    def __init__(self, sizes=None):
+        # static file, relative with "/" -> (width, height)
+        self.sizes = sizes if sizes is not None else {}
+        self.digest = hashlib.sha1(
+            json.dumps(sorted(self.sizes.items())).encode()
+        ).hexdigest()
+
+    @classmethod
+    def build(cls, static_dir, cache, files=None):
+        # cache is the build manifest's {name: [mtime, size, width, height]},
+        # images keeping their mtime and size aren't read again. files is the
+        # site index of static_dir, scanned here when not given
+        sizes = {}
+        seen = set()
+        for f in files if files is not None else scan(static_dir):
+            if path.splitext(f.name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            seen.add(f.name)
+            cached = cache.get(f.name)
+            if not cached or cached[:2] != [f.mtime_ns, f.size]:
+                try:
+                    width, height = image_size(f.source)
+                except (OSError, ValueError, struct.error) as e:
+                    print(f"Warning: can't read the size of {f.source}: {e}")
+                    width = height = None
+                cached = [f.mtime_ns, f.size, width, height]
+                cache[f.name] = cached
+            if cached[2] is not None:
+                sizes[f.name] = (cached[2], cached[3])
+        for name in [n for n in cache if n not in seen]:
+            del cache[name]
+        return cls(sizes)
+
+    def get(self, url):
+        # only root relative urls point into the static directory
+        if not url.startswith("/"):
+            return None
+        return self.sizes.get(url[1:])
+
+    def used(self, urls):
+        # {url: [width, height] or None} for the given urls, what a page or
+        # block rendered with them depends on
+        used = {}
+        for url in sorted(set(urls)):
+            size = self.get(url)
+            used[url] = list(size) if size else None
+        return used
+
+    def missing(self, urls):
+        return [u for u in urls if u.startswith("/") and u[1:] not in self.sizes]
+
+    def __eq__(self, other):
+        return isinstance(other, ImageSizes) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+
+def use(sizes):
+    global _active
+    _active = sizes
+
+
+def active():
+    return _active
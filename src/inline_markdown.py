@@ -1,16 +1,39 @@
 from textnode import TextType, TextNode
-from constants import IMAGES_REGEX, LINK_REGEX
+from constants import IMAGES_REGEX, LINK_REGEX, INLINE_REGEX
 import re
 
+INLINE_PATTERN = re.compile(INLINE_REGEX, re.DOTALL)
+DELIMITERS = ("**", "_", "`")
+# INLINE_REGEX group that closes each kind of match -> (text group, type)
+MATCH_TYPES = {
+    1: (1, TextType.BOLD),
+    2: (2, TextType.ITALIC),
+    3: (3, TextType.CODE),
+    5: (4, TextType.IMAGE),
+    7: (6, TextType.LINK),
+}
+
 
 def text_to_text_nodes(text):
-    node = TextNode(text, TextType.TEXT)
-    all_nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
-    all_nodes = split_nodes_delimiter(all_nodes, "_", TextType.ITALIC)
-    all_nodes = split_nodes_delimiter(all_nodes, "`", TextType.CODE)
-    all_nodes = split_nodes_image(all_nodes)
-    all_nodes = split_nodes_link(all_nodes)
-    return all_nodes
+    nodes = []
+    prev_end = 0
+    for m in INLINE_PATTERN.finditer(text):
+        if m.start() > prev_end:
+            nodes.append(plain_text_node(text[prev_end : m.start()]))
+        text_group, text_type = MATCH_TYPES[m.lastindex]
+        url = m.group(m.lastindex) if m.lastindex != text_group else None
+        nodes.append(TextNode(m.group(text_group), text_type, url))
+        prev_end = m.end()
+    if prev_end < len(text):
+        nodes.append(plain_text_node(text[prev_end:]))
+    return nodes
+
+
+def plain_text_node(text):
+    for delimiter in DELIMITERS:
+        if delimiter in text:
+            raise ValueError("delimiter isnt paired")
+    return TextNode(text, TextType.TEXT)
 
 
 def split_nodes_delimiter(
@@ -71,7 +94,7 @@ def split_nodes_image(old_nodes):
                         new_nodes.append(TextNode(text, TextType.TEXT))
                     new_nodes.append(TextNode(alt, TextType.IMAGE, url))
                     prev_end = im_end
-                if prev_end < len(n.text) - 1:
+                if prev_end < len(n.text):
                     new_nodes.append(TextNode(n.text[prev_end:], TextType.TEXT))
     return new_nodes
 
@@ -96,7 +119,7 @@ def split_nodes_link(old_nodes):
                         new_nodes.append(TextNode(text, TextType.TEXT))
                     new_nodes.append(TextNode(alt, TextType.LINK, url))
                     prev_end = link_end
-                if prev_end < len(n.text) - 1:
+                if prev_end < len(n.text):
                     new_nodes.append(
                         TextNode(
                             n.text[prev_end:],
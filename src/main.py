@@ -1,19 +1,326 @@
+import argparse
+import os
+from os import path as path
+import shutil
+import threading
 import utils
-import sys
+import profiler
+import block_cache
+import images
+from aggregates import write_aggregates
+from assets import ASSET_MANIFEST, AssetManifest
+from build import DirSource, build, open_sink
+from compress import COMPRESSED_SUFFIXES, compress_outputs
+from copy_strategies import COPY_STRATEGIES
+from manifest import BuildManifest
+from partials import Partials, partials_dir
+from pipeline import render_pages_pipelined
+from preview import PreviewSite
+from serve import Site, make_server, run
+from site_index import SiteIndex, ignore_patterns
+from template import load_template
+from watch import Watcher
+
+MANIFEST_PATH = "./.build-manifest.json"
+STATIC_DIR = "./static/"
+CONTENT_DIR = "./content/"
+TEMPLATE_PATH = "./template.html"
+DEST_DIR = "./docs/"
+CACHE_DIR = "./.cache/"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the static site")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of processes used to render pages (default: cpu count)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="build from scratch into this directory, .tar(.gz) or .zip instead",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="render in this process while --jobs threads read and write pages",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content when their mtimes differ",
+    )
+    parser.add_argument(
+        "--copy-strategy",
+        choices=COPY_STRATEGIES,
+        default="copy",
+        help="how static files are staged into the output directory",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="delete the output directory and rebuild everything",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="render every markdown block instead of reusing cached html",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="empty the block cache before building",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=100_000,
+        help="maximum number of rendered blocks kept in the cache",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip comments and collapse whitespace in generated pages",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy static files under content hashed names and rewrite references",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br with brotli installed) siblings of text outputs",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="absolute url of the site, writes sitemap.xml and an rss feed.xml",
+    )
+    parser.add_argument(
+        "--ignore",
+        metavar="PATTERN",
+        action="append",
+        default=[],
+        help="leave out sources matching this glob, besides dotfiles and swap files",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="build the pages in _drafts directories too",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild what changed after every save",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="PORT",
+        type=int,
+        nargs="?",
+        const=8888,
+        help="serve the output after building, next to --watch if given",
+    )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="serve pages rendered on request instead of building the site",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.02,
+        help="seconds between checks for changes in watch mode, at least twice "
+        "the last check, which takes about 20 ms per 1000 files",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="don't print a line for every generated page",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every build stage and print a summary",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=10,
+        help="number of slowest pages listed by --profile",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="write a Chrome trace-event timeline of the build (implies --profile)",
+    )
+    return parser.parse_args()
 
 
 def main():
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+    args = parse_args()
+    ignore = ignore_patterns(args.drafts, args.ignore)
+    if args.preview:
+        site = PreviewSite(
+            CONTENT_DIR,
+            STATIC_DIR,
+            TEMPLATE_PATH,
+            args.basepath,
+            args.quiet,
+            ignore=ignore,
+        )
+        run(make_server(site, port=args.serve or 8888))
+        return
+    if args.output:
+        build_to(args, ignore)
+        return
+    if args.profile or args.trace:
+        profiler.enable()
+    if args.clear_cache:
+        block_cache.BlockCache(CACHE_DIR).clear()
+    cache = None if args.no_cache else block_cache.use(CACHE_DIR, args.cache_size)
+    if args.clean:
+        shutil.rmtree(DEST_DIR, ignore_errors=True)
+        manifest = BuildManifest(MANIFEST_PATH)
     else:
-        basepath = "/"
-    utils.copy_files("./static/", "./docs/")
-    utils.generate_page_recursive(
-        basepath,
-        "./content/",
-        "./template.html",
-        "./docs/",
-    )
+        manifest = BuildManifest.load(MANIFEST_PATH)
+    keep = manifest.outputs()
+    # every later stage works from this one scan of the sources
+    with profiler.stage("discover"):
+        index = SiteIndex.scan(CONTENT_DIR, STATIC_DIR, DEST_DIR, ignore)
+    assets = None
+    if args.fingerprint:
+        with profiler.stage("fingerprint"):
+            assets = AssetManifest.build(STATIC_DIR, manifest.assets, index.assets)
+        keep.add(path.abspath(path.join(DEST_DIR, ASSET_MANIFEST)))
+    with profiler.stage("copy_files"):
+        utils.copy_files(
+            STATIC_DIR,
+            DEST_DIR,
+            keep=keep,
+            checksum=args.checksum,
+            strategy=args.copy_strategy,
+            jobs=args.jobs,
+            keep_siblings=COMPRESSED_SUFFIXES if args.compress else (),
+            names=assets.names if assets else None,
+            files=index.assets,
+        )
+    if assets:
+        assets.save(DEST_DIR)
+    with profiler.stage("image_sizes"):
+        image_sizes = images.ImageSizes.build(
+            STATIC_DIR, manifest.images, index.assets
+        )
+    images.use(image_sizes)
+    try:
+        utils.generate_page_recursive(
+            args.basepath,
+            CONTENT_DIR,
+            TEMPLATE_PATH,
+            DEST_DIR,
+            manifest=manifest,
+            jobs=args.jobs,
+            quiet=args.quiet,
+            minify=args.minify,
+            assets=assets,
+            image_sizes=image_sizes,
+            renderer=render_pages_pipelined if args.pipeline else utils.render_pages,
+            pages=index.pages,
+        )
+        with profiler.stage("aggregates"):
+            changed = write_aggregates(
+                manifest,
+                DEST_DIR,
+                load_template(TEMPLATE_PATH, args.basepath, args.minify, assets),
+                args.basepath,
+                args.site_url,
+                Partials.load(partials_dir(TEMPLATE_PATH)),
+            )
+        print(f"Updated {len(changed)} section indexes and feeds")
+        if args.compress:
+            with profiler.stage("compress"):
+                compress_outputs(DEST_DIR, args.jobs)
+        report_profile(args)
+    except BaseException:
+        # keep what was built before the failure
+        save_state(manifest, cache)
+        raise
+    # a dev server or watcher usually ends with a signal, save first
+    save_state(manifest, cache)
+
+    server = None
+    if args.serve:
+        site = Site(DEST_DIR, args.basepath, args.quiet)
+        server = make_server(site, port=args.serve)
+        if not args.watch:
+            run(server)
+        else:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+    if args.watch:
+        try:
+            Watcher(
+                args.basepath,
+                CONTENT_DIR,
+                STATIC_DIR,
+                TEMPLATE_PATH,
+                DEST_DIR,
+                manifest=manifest,
+                strategy=args.copy_strategy,
+                interval=args.poll_interval,
+                minify=args.minify,
+                assets=assets,
+                image_sizes=image_sizes,
+                ignore=ignore,
+                site_url=args.site_url,
+                compress=args.compress,
+                quiet=args.quiet,
+            ).run()
+        finally:
+            if server:
+                server.server_close()
+            save_state(manifest, cache)
+
+
+def save_state(manifest, cache):
+    manifest.save()
+    if cache:
+        print(cache.stats())
+        cache.save()
+
+
+def build_to(args, ignore):
+    with open(TEMPLATE_PATH) as f:
+        template = f.read()
+    partials = partials_dir(TEMPLATE_PATH)
+    with open_sink(args.output) as sink:
+        build(
+            DirSource(CONTENT_DIR, ignore),
+            template,
+            static=DirSource(STATIC_DIR, ignore),
+            sink=sink,
+            basepath=args.basepath,
+            partials=DirSource(partials) if path.isdir(partials) else None,
+            minify=args.minify,
+            fingerprint=args.fingerprint,
+            site_url=args.site_url,
+        )
+    print(f"Wrote the site to {args.output}")
+
+
+def report_profile(args):
+    if not profiler.is_enabled():
+        return
+    active = profiler.enable()
+    print(active.summary(args.slowest))
+    if args.trace:
+        active.write_trace(args.trace)
+        print(f"Wrote trace to {args.trace}")
 
 
 if __name__ == "__main__":
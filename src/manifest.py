@@ -0,0 +1,171 @@
+from os import path as path
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 2
+HASH_CHUNK_SIZE = 1 << 16
+
+
+def file_digest(file_path):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildManifest:
+    def __init__(
+        self, manifest_path, pages=None, assets=None, images=None, generated=None
+    ):
+        self.path = path.abspath(manifest_path)
+        self.root = path.dirname(self.path)
+        self.pages = pages if pages is not None else {}
+        # static file -> [mtime, size, hash], see AssetManifest.build()
+        self.assets = assets if assets is not None else {}
+        # image -> [mtime, size, width, height], see ImageSizes.build()
+        self.images = images if images is not None else {}
+        # outputs made from the page summaries, see write_aggregates()
+        self.generated = generated if generated is not None else []
+
+    @classmethod
+    def load(cls, manifest_path):
+        try:
+            with open(manifest_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(manifest_path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(manifest_path)
+        return cls(
+            manifest_path,
+            data.get("pages", {}),
+            data.get("assets", {}),
+            data.get("images", {}),
+            data.get("generated", []),
+        )
+
+    def save(self):
+        data = {"version": MANIFEST_VERSION, "pages": self.pages}
+        if self.assets:
+            data["assets"] = self.assets
+        if self.images:
+            data["images"] = self.images
+        if self.generated:
+            data["generated"] = self.generated
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def key(self, file_path):
+        return path.relpath(path.abspath(file_path), self.root)
+
+    def outputs(self):
+        outputs = list(self.pages) + self.generated
+        return {path.join(self.root, dest) for dest in outputs}
+
+    def is_fresh(
+        self,
+        dest_path,
+        source_path,
+        template_hash,
+        basepath,
+        partials=None,
+        stamp=None,
+        image_sizes=None,
+    ):
+        # stamp is the (mtime, size) of the source when already known
+        entry = self.pages.get(self.key(dest_path))
+        if entry is None or not path.exists(dest_path):
+            return False
+        if (
+            entry["source"] != self.key(source_path)
+            or entry["template"] != template_hash
+            or entry["basepath"] != basepath
+        ):
+            return False
+        for name, digest in entry.get("partials", {}).items():
+            if partials is None or partials.digest(name) != digest:
+                return False
+        # only the images the page uses, not every one in the static tree
+        used = entry.get("images")
+        if used and (image_sizes is None or image_sizes.used(used) != used):
+            return False
+
+        if stamp is None:
+            st = os.stat(source_path)
+            stamp = st.st_mtime_ns, st.st_size
+        mtime_ns, size = stamp
+        if entry["size"] != size:
+            return False
+        if entry["mtime"] == mtime_ns:
+            return True
+        # touched but not necessarily edited, fall back to the content hash
+        if entry["hash"] != file_digest(source_path):
+            return False
+        entry["mtime"] = mtime_ns
+        return True
+
+    def record(
+        self,
+        dest_path,
+        source_path,
+        template_hash,
+        basepath,
+        partial_hashes=None,
+        summary=None,
+        image_sizes=None,
+    ):
+        # image_sizes is {url: [width, height] or None} of the page's images
+        st = os.stat(source_path)
+        self.pages[self.key(dest_path)] = {
+            "source": self.key(source_path),
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+            "hash": file_digest(source_path),
+            "template": template_hash,
+            "basepath": basepath,
+            "partials": partial_hashes or {},
+        }
+        if image_sizes:
+            self.pages[self.key(dest_path)]["images"] = image_sizes
+        if summary is not None:
+            self.pages[self.key(dest_path)]["summary"] = summary
+
+    def remove_stale(self, seen_dest_paths, dest_dir_path):
+        seen = {self.key(p) for p in seen_dest_paths}
+        removed = []
+        for dest in [d for d in self.pages if d not in seen]:
+            del self.pages[dest]
+            dest_path = path.join(self.root, dest)
+            if path.exists(dest_path):
+                os.remove(dest_path)
+                remove_empty_dirs(path.dirname(dest_path), dest_dir_path)
+            removed.append(dest_path)
+        return removed
+
+    def set_generated(self, keys, dest_dir_path):
+        removed = []
+        for dest in set(self.generated) - set(keys):
+            if dest in self.pages:
+                # a page of its own took the place of the generated one
+                continue
+            dest_path = path.join(self.root, dest)
+            if path.exists(dest_path):
+                os.remove(dest_path)
+                remove_empty_dirs(path.dirname(dest_path), dest_dir_path)
+            removed.append(dest_path)
+        self.generated = sorted(keys)
+        return removed
+
+
+def remove_empty_dirs(dir_path, stop_at):
+    dir_path = path.abspath(dir_path)
+    stop_at = path.abspath(stop_at)
+    while dir_path != stop_at and dir_path.startswith(stop_at + os.sep):
+        if os.listdir(dir_path):
+            return
+        os.rmdir(dir_path)
+        dir_path = path.dirname(dir_path)
@@ -1,6 +1,12 @@
+import itertools
+import json
+import re
 from enum import Enum
+from constants import INCLUDE_REGEX
+from document import Document
+import images
 from htmlnode import ParentNode, LeafNode
-from inline_markdown import text_to_text_nodes
+from inline_markdown import extract_markdown_images, text_to_text_nodes
 from textnode import text_node_to_html_node
 
 
@@ -13,110 +19,223 @@ class BlockType(Enum):
     OLIST = "ordered_list"
 
 
+HEADINGS = frozenset({"#", "##", "###", "####", "#####", "######"})
+FENCE = "```"
+
+
 def block_to_block_type(block):
-    block_start = block.split(" ")[0]
-    headings = {
-        "#",
-        "##",
-        "###",
-        "####",
-        "#####",
-        "######",
-    }
-
-    if block_start in headings:
+    block_start = block.split(" ", maxsplit=1)[0]
+
+    if block_start in HEADINGS:
         return BlockType.HEADING
 
     lines = block.split("\n")
 
-    if lines[0].strip().startswith("```") and lines[-1].startswith("```"):
+    if lines[0].strip().startswith(FENCE) and lines[-1].startswith(FENCE):
         return BlockType.CODE
 
-    if block_start.startswith(">") and all(
-        [line.startswith(">") for line in lines],
-    ):
+    if block_start.startswith(">") and all(line.startswith(">") for line in lines):
         return BlockType.QUOTE
 
-    if all(
-        [line.startswith("- ") for line in lines],
-    ):
+    if all(line.startswith("- ") for line in lines):
         return BlockType.ULIST
 
-    if all(
-        [line.startswith(f"{i + 1}. ") for i, line in enumerate(lines)],
-    ):
+    if all(line.startswith(f"{i + 1}. ") for i, line in enumerate(lines)):
         return BlockType.OLIST
 
     return BlockType.PARAGRAPH
 
 
+class LineBlock:
+    # a block being read line by line, classified as the lines come in
+    def __init__(self, fenced=False):
+        self.lines = []
+        self.fenced = fenced
+        self.quote = True
+        self.ulist = True
+        self.olist = True
+
+    def add(self, line):
+        if not self.lines:
+            line = line.lstrip()
+        if not self.fenced:
+            self.quote = self.quote and line.startswith(">")
+            self.ulist = self.ulist and line.startswith("- ")
+            self.olist = self.olist and line.startswith(f"{len(self.lines) + 1}. ")
+        self.lines.append(line)
+
+    def block_type(self):
+        if self.fenced:
+            return BlockType.CODE
+        first = self.lines[0]
+        if " " in first and first.split(" ", maxsplit=1)[0] in HEADINGS:
+            return BlockType.HEADING
+        if self.quote:
+            return BlockType.QUOTE
+        if self.ulist:
+            return BlockType.ULIST
+        if self.olist:
+            return BlockType.OLIST
+        return BlockType.PARAGRAPH
+
+    def finish(self):
+        return self.block_type(), "\n".join(self.lines).strip()
+
+
+def iter_blocks(lines):
+    block = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+
+        if block and block.fenced:
+            block.add(line)
+            if stripped.startswith(FENCE):
+                yield block.finish()
+                block = None
+            continue
+
+        if stripped.startswith(FENCE):
+            # a fence also ends the block before it
+            if block:
+                yield block.finish()
+            block = LineBlock(fenced=True)
+            block.add(line)
+            if len(stripped) >= 2 * len(FENCE) and stripped.endswith(FENCE):
+                yield block.finish()
+                block = None
+        elif not stripped:
+            if block:
+                yield block.finish()
+                block = None
+        else:
+            if block is None:
+                block = LineBlock()
+            block.add(line)
+
+    if block:
+        yield block.finish()
+
+
 def markdown_to_blocks(markdown):
-    # TODO: handle empty lines in code block
-    # ```
-    # some code
-    #
-    # ```
-    # should treat as single code block
-    blocks = list(
-        filter(
-            lambda s: len(s) > 0,
-            map(
-                lambda s: s.strip(),
-                markdown.split("\n\n"),
-            ),
-        )
-    )
-    return blocks
+    return [block for _, block in iter_blocks(markdown.splitlines())]
+
+
+def split_front_matter(markdown):
+    metadata, lines = read_front_matter(iter(markdown.split("\n")))
+    return metadata, "\n".join(lines)
+
+
+def read_front_matter(lines):
+    # consumes the front matter off an iterator of lines, e.g. an open file,
+    # and returns it with an iterator over the lines after it
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    if first.strip() != "---":
+        return {}, itertools.chain([first], lines)
+    metadata = {}
+    for line in lines:
+        if line.strip() == "---":
+            return metadata, lines
+        if ":" in line:
+            key, value = line.split(":", maxsplit=1)
+            metadata[key.strip()] = value.strip()
+    raise ValueError("front matter isnt closed")
 
 
 def markdown_to_html_node(markdown):
+    return markdown_to_document(markdown).root
+
+
+def markdown_to_document(markdown, metadata=None, cache=None, partials=None):
+    # markdown is either a string or any iterable of lines, e.g. a file
+    if isinstance(markdown, str):
+        markdown = markdown.splitlines()
     root = ParentNode("div", [])
-    blocks = markdown_to_blocks(markdown)
-
-    for b in blocks:
-        bt = block_to_block_type(b)
-        node = ParentNode(block_type_to_tag(bt, b), [])
-        match bt:
-            case BlockType.PARAGRAPH:
-                node = get_paragraph_node(b)
-            case BlockType.HEADING:
-                text = b.split(" ", maxsplit=1)[1]
-                node = LeafNode(node.tag, text)
-            case BlockType.CODE:
-                node.children.append(get_code_block_node(b))
-
-            case BlockType.QUOTE:
-                node.children = get_quote_block_children(b)
-            case BlockType.ULIST:
-                node.children = get_list_items(b)
-            case BlockType.OLIST:
-                node.children = get_list_items(b)
-            case _:
-                raise ValueError(f"invalid block type: {bt}")
-        root.children.append(node)
-
-    return root
-
-
-def get_list_items(block):
+    doc = Document(root, metadata)
+    sizes = images.active()
+
+    for bt, b in iter_blocks(markdown):
+        include = partials is not None and re.fullmatch(INCLUDE_REGEX, b)
+        if include:
+            # a paragraph holding just {{> name }} becomes the partial
+            root.children.append(LeafNode(None, partials.get(include.group(1))))
+            doc.includes.append(include.group(1))
+            continue
+        if cache is None:
+            root.children.append(block_to_html_node(bt, b, doc))
+            continue
+        key = cache.key(b, image_salt(b, sizes))
+        cached = cache.get(key)
+        if cached is None:
+            block_doc = Document(None)
+            node = block_to_html_node(bt, b, block_doc)
+            cached = (node.to_html(), block_doc.summary())
+            cache.put(key, cached)
+        html, summary = cached
+        root.children.append(LeafNode(None, html))
+        doc.merge(summary)
+
+    return doc
+
+
+def image_salt(block, sizes):
+    # images are rendered with their sizes, only the block's own matter
+    if not sizes or "![" not in block:
+        return ""
+    urls = [url for _, url in extract_markdown_images(block)]
+    return json.dumps(sizes.used(urls))
+
+
+def block_to_html_node(bt, b, doc):
+    node = ParentNode(block_type_to_tag(bt, b), [])
+    match bt:
+        case BlockType.PARAGRAPH:
+            node = get_paragraph_node(b, doc)
+        case BlockType.HEADING:
+            text = b.split(" ", maxsplit=1)[1]
+            node = LeafNode(node.tag, text)
+            doc.add_heading(int(node.tag[1:]), text)
+        case BlockType.CODE:
+            code = get_code_block_node(b)
+            node.children.append(code)
+            doc.add_code(code.value)
+        case BlockType.QUOTE:
+            node.children = get_quote_block_children(b, doc)
+        case BlockType.ULIST:
+            node.children = get_list_items(b, doc)
+        case BlockType.OLIST:
+            node.children = get_list_items(b, doc)
+        case _:
+            raise ValueError(f"invalid block type: {bt}")
+    return node
+
+
+def get_list_items(block, doc=None):
     all_nodes = []
     lines = [line.split(" ", maxsplit=1)[1] for line in block.splitlines()]
     for line in lines:
-        all_nodes.append(ParentNode("li", text_to_html_nodes(line)))
+        all_nodes.append(ParentNode("li", text_to_html_nodes(line, doc)))
     return all_nodes
 
 
 def get_code_block_node(b):
-    code = b.split("```")
+    if "\n" not in b:
+        return LeafNode("code", b.strip("`") + "\n")
+    # drop the fences (and the language after the opening one)
+    lines = b.split("\n")[1:]
+    if lines and lines[-1].strip().startswith(FENCE):
+        lines.pop()
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    while lines and not lines[-1].strip():
+        lines.pop()
     # code block should end with \n
-    node = LeafNode(
-        "code",
-        "\n".join([s for s in code[1].splitlines() if s.strip()]) + "\n",
-    )
-    return node
+    return LeafNode("code", "\n".join(lines) + "\n")
 
 
-def get_quote_block_children(block):
+def get_quote_block_children(block, doc=None):
     text = " ".join(
         [
             line.split(" ", maxsplit=1)[1]
@@ -125,14 +244,14 @@ def get_quote_block_children(block):
         ]
     )
 
-    return text_to_html_nodes(text)
+    return text_to_html_nodes(text, doc)
 
 
-def get_paragraph_node(content):
+def get_paragraph_node(content, doc=None):
     content = " ".join(
         [line.strip() for line in content.splitlines() if line.strip()],
     )
-    return ParentNode("p", text_to_html_nodes(content))
+    return ParentNode("p", text_to_html_nodes(content, doc))
 
 
 def block_type_to_tag(bt, block):
@@ -154,7 +273,9 @@ def block_type_to_tag(bt, block):
             raise ValueError(f"invalid block type: {bt}")
 
 
-def text_to_html_nodes(text):
+def text_to_html_nodes(text, doc=None):
     text_nodes = text_to_text_nodes(text)
+    if doc is not None:
+        doc.add_text_nodes(text_nodes)
     children = [text_node_to_html_node(n) for n in text_nodes]
     return children
@@ -0,0 +1,76 @@
+import re
+from constants import HTML_TOKEN_REGEX
+
+# whitespace inside these is content
+PRESERVED_TAGS = frozenset({"pre", "code", "textarea", "script", "style"})
+
+_token = re.compile(HTML_TOKEN_REGEX, re.S)
+_whitespace = re.compile(r"\s+")
+
+
+class Minifier:
+    # minifies a stream of html chunks, e.g. the ones from iter_html(),
+    # remembering across chunks whether it is inside a preserved element.
+    # tags must not be split between chunks
+    def __init__(self, strip_indentation=False):
+        # drop whitespace-only text containing a newline, fine for template
+        # markup, generated text may rely on it as a word separator
+        self.strip_indentation = strip_indentation
+        self.depth = 0
+        self.saved = 0
+
+    def feed(self, html):
+        out = []
+        pos = 0
+        for m in _token.finditer(html):
+            out.append(self.text(html[pos : m.start()]))
+            pos = m.end()
+            if m.group().startswith("<!--"):
+                # kept verbatim inside e.g. <script>
+                if self.depth:
+                    out.append(m.group())
+                continue
+            self.depth = preserved_depth(self.depth, m)
+            out.append(m.group())
+        out.append(self.text(html[pos:]))
+        minified = "".join(out)
+        self.saved += len(html) - len(minified)
+        return minified
+
+    def text(self, text):
+        if self.depth or not text:
+            return text
+        if self.strip_indentation and "\n" in text and not text.strip():
+            return ""
+        return _whitespace.sub(" ", text)
+
+
+def preserved_depth(depth, m):
+    # the depth after the token m, a match of HTML_TOKEN_REGEX
+    tag = m.group(2)
+    if not tag or tag.lower() not in PRESERVED_TAGS:
+        return depth
+    if m.group(1):
+        return max(0, depth - 1)
+    if m.group().endswith("/>"):
+        return depth
+    return depth + 1
+
+
+def depths_at(html, offsets):
+    # the preserved element depth at each of the sorted offsets into html
+    depths = []
+    depth = 0
+    tokens = _token.finditer(html)
+    m = next(tokens, None)
+    for offset in offsets:
+        while m is not None and m.end() <= offset:
+            if not m.group().startswith("<!--"):
+                depth = preserved_depth(depth, m)
+            m = next(tokens, None)
+        depths.append(depth)
+    return depths
+
+
+def minify_html(html, strip_indentation=False):
+    return Minifier(strip_indentation).feed(html)
@@ -0,0 +1,89 @@
+from os import path as path
+import hashlib
+import os
+from manifest import file_digest
+from markdown_block import markdown_to_html_node
+
+PARTIALS_DIR = "partials"
+PARTIAL_EXTENSIONS = (".html", ".md")
+
+# content hash -> rendered html, shared by every load in this process
+_rendered = {}
+
+
+class Partials:
+    def __init__(self, partials_dir=None):
+        self.dir = partials_dir
+        # name -> (content hash, path)
+        self.files = {}
+
+    @classmethod
+    def load(cls, partials_dir):
+        partials = cls(partials_dir)
+        if not partials_dir or not path.isdir(partials_dir):
+            return partials
+        for file in sorted(os.listdir(partials_dir)):
+            name, ext = path.splitext(file)
+            if ext not in PARTIAL_EXTENSIONS or name in partials.files:
+                continue
+            file_path = path.join(partials_dir, file)
+            digest = file_digest(file_path)
+            if digest not in _rendered:
+                _rendered[digest] = render_partial(file_path)
+            partials.files[name] = (digest, file_path)
+        return partials
+
+    @classmethod
+    def from_files(cls, files):
+        # {file name: source}, e.g. partials held in memory
+        partials = cls()
+        for file in sorted(files):
+            name, ext = path.splitext(file)
+            if ext not in PARTIAL_EXTENSIONS or name in partials.files:
+                continue
+            source = files[file]
+            digest = hashlib.sha256(source.encode()).hexdigest()
+            if digest not in _rendered:
+                _rendered[digest] = render_source(source, ext)
+            partials.files[name] = (digest, None)
+        return partials
+
+    def get(self, name):
+        if name not in self.files:
+            raise ValueError(f"partial not found: {name}")
+        return _rendered[self.files[name][0]]
+
+    def digests(self, names):
+        return {name: self.digest(name) for name in names}
+
+    def digest(self, name):
+        entry = self.files.get(name)
+        return entry[0] if entry else None
+
+    def path(self, name):
+        entry = self.files.get(name)
+        return entry[1] if entry else None
+
+    def __getstate__(self):
+        # ship the rendered html along, worker processes don't re-render
+        return self.dir, self.files, {d: _rendered[d] for d, _ in self.files.values()}
+
+    def __setstate__(self, state):
+        self.dir, self.files, rendered = state
+        _rendered.update(rendered)
+
+
+def partials_dir(template_path):
+    # partials live in a directory next to the template
+    return path.join(path.dirname(path.abspath(template_path)), PARTIALS_DIR)
+
+
+def render_partial(file_path):
+    with open(file_path) as f:
+        return render_source(f.read(), path.splitext(file_path)[1])
+
+
+def render_source(source, ext):
+    if ext == ".md":
+        return markdown_to_html_node(source).to_html()
+    return source
@@ -0,0 +1,94 @@
+from os import path as path
+import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import images
+import profiler
+from utils import log_page, parse_page, read_page
+
+# pages in flight on either side of the render stage, caps the memory held
+# by prefetched sources and by rendered pages waiting to be written
+QUEUE_SIZE = 32
+
+
+def render_pages_pipelined(
+    basepath,
+    pages,
+    template_path,
+    jobs=1,
+    quiet=False,
+    partials=None,
+    minify=False,
+    assets=None,
+    image_sizes=None,
+    queue_size=QUEUE_SIZE,
+):
+    # a drop-in for render_pages: reader threads prefetch sources, this
+    # thread parses and renders, writer threads flush the outputs. jobs is
+    # the size of each thread pool, pages come out in their original order
+    images.use(image_sizes)
+    pages = iter(pages)
+    reads = deque()
+    writes = deque()
+    readers = ThreadPoolExecutor(max(1, jobs), "read")
+    writers = ThreadPoolExecutor(max(1, jobs), "write")
+
+    def prefetch():
+        while len(reads) < queue_size:
+            page = next(pages, None)
+            if page is None:
+                return
+            reads.append((page, readers.submit(read_page, path.abspath(page[0]))))
+
+    def finish():
+        (from_path, dest_path), doc, written = writes.popleft()
+        try:
+            written.result()
+        except Exception as e:
+            raise Exception(f"Failed to generate page from {from_path}: {e}") from e
+        if not quiet:
+            log_page(from_path, template_path, dest_path)
+        return from_path, dest_path, doc
+
+    try:
+        prefetch()
+        while reads:
+            page, source = reads.popleft()
+            prefetch()
+            try:
+                template, doc, values = parse_page(
+                    basepath,
+                    path.abspath(page[0]),
+                    source.result(),
+                    path.abspath(template_path),
+                    partials,
+                    minify,
+                    assets,
+                )
+                with profiler.stage("render", path.abspath(page[0])):
+                    out = io.StringIO()
+                    doc.bytes_saved = template.render_to(out, values, partials)
+            except Exception as e:
+                raise Exception(f"Failed to generate page from {page[0]}: {e}") from e
+            # the caller wants what was collected, not the tree
+            doc.root = None
+            html = out.getvalue()
+            written = writers.submit(
+                write_output, path.abspath(page[1]), html, path.abspath(page[0])
+            )
+            writes.append((page, doc, written))
+            while writes and (len(writes) >= queue_size or writes[0][2].done()):
+                yield finish()
+        while writes:
+            yield finish()
+    finally:
+        readers.shutdown(cancel_futures=True)
+        writers.shutdown()
+
+
+def write_output(dest_path, html, from_path=None):
+    with profiler.stage("write", from_path):
+        os.makedirs(path.dirname(dest_path), exist_ok=True)
+        with open(dest_path, "w") as f:
+            f.write(html)
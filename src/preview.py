@@ -0,0 +1,144 @@
+from os import path as path
+import hashlib
+import io
+import os
+from urllib.parse import unquote, urlsplit
+from aggregates import (
+    listed_page,
+    page_summary,
+    render_sections,
+    section_of,
+    section_of_index,
+    section_page_name,
+)
+from partials import Partials, partials_dir
+from serve import CachedFile, FileCache, MemoryCache, resolve
+from site_index import IGNORE_PATTERNS, SiteIndex, is_ignored, page_output
+from template import load_template
+from utils import parse_document, parse_page, read_page
+from watch import snapshot
+
+# rendered pages kept in memory, the least recently used go first
+MAX_PREVIEW_BYTES = 64 << 20
+
+
+class PreviewSite:
+    # renders pages from markdown when they are requested, nothing is
+    # written to the output directory
+    def __init__(
+        self,
+        content_dir,
+        static_dir,
+        template_path,
+        basepath="/",
+        quiet=False,
+        max_bytes=MAX_PREVIEW_BYTES,
+        ignore=IGNORE_PATTERNS,
+    ):
+        self.content_dir = path.realpath(content_dir)
+        self.static_dir = path.realpath(static_dir)
+        self.template_path = path.abspath(template_path)
+        self.partials_dir = partials_dir(self.template_path)
+        self.basepath = basepath
+        self.quiet = quiet
+        self.ignore = ignore
+        self.pages = MemoryCache(max_bytes)
+        # source -> (stamp, summary) of the pages section indexes list
+        self.summaries = {}
+        self.cache = FileCache(self.static_dir)
+
+    def lookup(self, url):
+        # a CachedFile, the url to redirect to as a str, or None
+        url_path = unquote(urlsplit(url).path)
+        static = resolve(self.static_dir, self.basepath, url_path)
+        if static and path.isfile(static) and not self.is_ignored(static):
+            return self.cache.load(static)
+        # the mapping find_pages makes, content/a/index.md is a/index.html
+        found = resolve(self.content_dir, self.basepath, url_path)
+        if found and path.isdir(found):
+            if not url_path.endswith("/"):
+                return url_path + "/"
+            found = path.join(found, "index.html")
+        elif found and url_path.endswith("/"):
+            # no such directory, maybe a later page of a section index
+            found = path.join(found, "index.html")
+        if not found or not found.endswith(".html"):
+            return None
+        source = found[: -len(".html")] + ".md"
+        if self.is_ignored(source):
+            return None
+        if not path.isfile(source):
+            name = path.relpath(found, self.content_dir).replace(os.sep, "/")
+            return self.render_section(name)
+        return self.render(source)
+
+    def is_ignored(self, file_path):
+        # what a build leaves out isn't previewed either
+        for root in (self.static_dir, self.content_dir):
+            if file_path.startswith(root + os.sep):
+                name = path.relpath(file_path, root).replace(os.sep, "/")
+                return is_ignored(name, self.ignore)
+        return False
+
+    def dependency_stamp(self):
+        template = os.stat(self.template_path)
+        return (
+            template.st_mtime_ns,
+            template.st_size,
+            tuple(sorted(snapshot([self.partials_dir]).items())),
+        )
+
+    def render(self, source):
+        st = os.stat(source)
+        # editing the page, the template or a partial renders the page again
+        stamp = (st.st_mtime_ns, st.st_size) + self.dependency_stamp()
+        cached = self.pages.get(source, stamp)
+        if cached:
+            return cached
+        partials = Partials.load(self.partials_dir)
+        page, doc, values = parse_page(
+            self.basepath, source, read_page(source), self.template_path, partials
+        )
+        out = io.StringIO()
+        page.render_to(out, values, partials)
+        body = out.getvalue().encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        dest = source[: -len(".md")] + ".html"
+        return self.pages.put(source, CachedFile(dest, stamp, etag, "text/html", body))
+
+    def render_section(self, name):
+        # the section index a build generates, None when there is none
+        section = section_of_index(name)
+        if section is None:
+            return None
+        pages = {}
+        stamp = self.dependency_stamp()
+        for f in SiteIndex.scan(self.content_dir, ignore=self.ignore).pages:
+            output = page_output(f.name)
+            if section_of(output) == section or output == section_page_name(
+                section, 1
+            ):
+                pages[output] = listed_page(self.summary(f), f.mtime_ns)
+                stamp += (f.name, f.mtime_ns, f.size)
+        cached = self.pages.get(name, stamp)
+        if cached:
+            return cached
+        template = load_template(self.template_path, self.basepath)
+        partials = Partials.load(self.partials_dir)
+        html = render_sections(pages, template, partials, only=name).get(name)
+        if html is None:
+            return None
+        body = html.encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        dest = path.join(self.content_dir, *name.split("/"))
+        return self.pages.put(name, CachedFile(dest, stamp, etag, "text/html", body))
+
+    def summary(self, f):
+        cached = self.summaries.get(f.source)
+        if cached and cached[0] == f.stamp:
+            return cached[1]
+        partials = Partials.load(self.partials_dir)
+        doc, _ = parse_document(f.source, read_page(f.source), partials)
+        summary = page_summary(doc)
+        self.summaries[f.source] = (f.stamp, summary)
+        return summary
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# profiler of the current process, None when profiling is off
+_active = None
+
+
+class Profiler:
+    def __init__(self):
+        # (stage, page, start, end, pid, tid), times from time.perf_counter
+        self.events = []
+
+    def record(self, name, page, start, end):
+        self.events.append(
+            (name, page, start, end, os.getpid(), threading.get_ident())
+        )
+
+    def merge(self, events):
+        self.events.extend(events)
+
+    def stage_totals(self):
+        durations = {}
+        for name, _, start, end, _, _ in self.events:
+            durations.setdefault(name, []).append(end - start)
+        return durations
+
+    def slowest_pages(self, n):
+        pages = {}
+        for _, page, start, end, _, _ in self.events:
+            if page is not None:
+                pages[page] = pages.get(page, 0) + end - start
+        return sorted(pages.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def summary(self, slowest=10):
+        lines = [
+            f"{'stage':<24} {'count':>7} {'total ms':>10} {'mean ms':>9} "
+            f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}"
+        ]
+        for name, durations in self.stage_totals().items():
+            durations.sort()
+            total = sum(durations)
+            lines.append(
+                f"{name:<24} {len(durations):>7} {total * 1000:>10.1f} "
+                f"{total / len(durations) * 1000:>9.3f} "
+                f"{percentile(durations, 0.5) * 1000:>8.3f} "
+                f"{percentile(durations, 0.9) * 1000:>8.3f} "
+                f"{percentile(durations, 0.99) * 1000:>8.3f}"
+            )
+        pages = self.slowest_pages(slowest)
+        if pages:
+            lines.append(f"slowest {len(pages)} pages:")
+            for page, seconds in pages:
+                lines.append(f"  {seconds * 1000:>9.3f} ms  {page}")
+        return "\n".join(lines)
+
+    def write_trace(self, trace_path):
+        origin = min((e[2] for e in self.events), default=0)
+        trace_events = []
+        for name, page, start, end, pid, tid in self.events:
+            event = {
+                "name": name,
+                "cat": "build",
+                "ph": "X",
+                "ts": (start - origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            if page is not None:
+                event["args"] = {"page": page}
+            trace_events.append(event)
+        with open(trace_path, "w") as f:
+            json.dump({"traceEvents": trace_events}, f)
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def enable():
+    global _active
+    if _active is None:
+        _active = Profiler()
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def is_enabled():
+    return _active is not None
+
+
+@contextmanager
+def collecting(enabled=True):
+    # records into a fresh profiler, e.g. for a task whose timings are
+    # shipped back from a worker process
+    global _active
+    previous = _active
+    _active = Profiler() if enabled else None
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def record(name, page, start, end):
+    # for stages that aren't one block of code, see stage()
+    if _active is not None:
+        _active.record(name, page, start, end)
+
+
+@contextmanager
+def stage(name, page=None):
+    if _active is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _active.record(name, page, start, time.perf_counter())
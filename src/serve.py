@@ -0,0 +1,281 @@
+from os import path as path
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import unquote, urlsplit
+from compress import COMPRESSIBLE_EXTENSIONS
+from manifest import file_digest
+
+DEST_DIR = "./docs/"
+# files up to this size are kept in memory, bodies and gzipped bodies
+MAX_CACHED_FILE = 1 << 20
+MAX_CACHE_BYTES = 64 << 20
+# (content encoding, sibling suffix) in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class CachedFile:
+    __slots__ = ("path", "stamp", "etag", "content_type", "body", "compressed")
+
+    def __init__(self, file_path, stamp, etag, content_type, body=None):
+        self.path = file_path
+        self.stamp = stamp
+        self.etag = etag
+        self.content_type = content_type
+        # None for files too big to keep in memory
+        self.body = body
+        self.compressed = None
+
+    def gzipped(self):
+        # compressed once, then served from memory like the body
+        if self.compressed is None:
+            self.compressed = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self.compressed
+
+    def size(self):
+        # the body and room for its gzipped copy, never bigger for text
+        return 2 * len(self.body) if self.body is not None else 0
+
+
+class MemoryCache:
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # key -> CachedFile, least recently used first
+        self.files = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, stamp):
+        with self.lock:
+            cached = self.files.get(key)
+            if cached is None or cached.stamp != stamp:
+                return None
+            self.files.move_to_end(key)
+            return cached
+
+    def put(self, key, cached):
+        with self.lock:
+            old = self.files.pop(key, None)
+            if old:
+                self.bytes -= old.size()
+            self.files[key] = cached
+            self.bytes += cached.size()
+            while self.bytes > self.max_bytes and len(self.files) > 1:
+                _, old = self.files.popitem(last=False)
+                self.bytes -= old.size()
+        return cached
+
+
+class FileCache(MemoryCache):
+    # etags are content hashes taken once per (mtime, size) of a file
+    def __init__(self, root, max_bytes=MAX_CACHE_BYTES):
+        super().__init__(max_bytes)
+        self.root = path.abspath(root)
+
+    def load(self, file_path):
+        st = os.stat(file_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self.get(file_path, stamp)
+        if cached:
+            return cached
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        body = None
+        if st.st_size <= MAX_CACHED_FILE:
+            with open(file_path, "rb") as f:
+                body = f.read()
+            digest = hashlib.sha256(body).hexdigest()
+        else:
+            digest = file_digest(file_path)
+        cached = CachedFile(file_path, stamp, f'"{digest[:32]}"', content_type, body)
+        return self.put(file_path, cached)
+
+
+class PooledHTTPServer(HTTPServer):
+    # like ThreadingHTTPServer, but requests share a fixed pool of threads
+    def __init__(self, address, handler, site, threads=16):
+        super().__init__(address, handler)
+        self.site = site
+        self.pool = ThreadPoolExecutor(threads, "serve")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Site:
+    def __init__(self, root, basepath="/", quiet=False):
+        self.root = path.abspath(root)
+        self.basepath = basepath
+        self.cache = FileCache(self.root)
+        self.quiet = quiet
+
+    def lookup(self, url):
+        # a CachedFile, the url to redirect to as a str, or None
+        url_path = unquote(urlsplit(url).path)
+        file_path = resolve(self.root, self.basepath, url_path)
+        if file_path and path.isdir(file_path):
+            if not url_path.endswith("/"):
+                return url_path + "/"
+            file_path = path.join(file_path, "index.html")
+        if not file_path or not path.isfile(file_path):
+            return None
+        return self.cache.load(file_path)
+
+
+def resolve(root, basepath, url_path):
+    # the path below root for a url path, None outside of it
+    if not url_path.startswith(basepath):
+        return None
+    file_path = path.realpath(path.join(root, url_path[len(basepath) :]))
+    if file_path != root and not file_path.startswith(root + os.sep):
+        return None
+    return file_path
+
+
+class SiteRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # idle keep-alive connections give their pool thread back after this
+    timeout = 5
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        try:
+            cached = self.server.site.lookup(self.path)
+        except Exception as e:
+            # e.g. a page that fails to render in preview mode
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, explain=str(e))
+            return
+        if cached is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        if isinstance(cached, str):
+            # relative links inside an index need the trailing slash
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", cached)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        encoding, suffix = self.pick_encoding(cached)
+        etag = cached.etag if not encoding else f'{cached.etag[:-1]}-{encoding}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_common_headers(etag)
+            self.end_headers()
+            return
+
+        if suffix:
+            with open(cached.path + suffix, "rb") as f:
+                body = f.read()
+        elif encoding:
+            body = cached.gzipped()
+        else:
+            body = cached.body
+        self.send_response(HTTPStatus.OK)
+        self.send_common_headers(etag)
+        self.send_header("Content-Type", cached.content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        length = len(body) if body is not None else cached.stamp[1]
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        if not send_body:
+            return
+        if body is not None:
+            self.wfile.write(body)
+        else:
+            with open(cached.path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+
+    def pick_encoding(self, cached):
+        # (content encoding, sibling suffix), suffix None when compressing here
+        if path.splitext(cached.path)[1] not in COMPRESSIBLE_EXTENSIONS:
+            return None, None
+        accepted = self.headers.get("Accept-Encoding", "")
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                # pre-compressed siblings carry the mtime of their file
+                if os.stat(cached.path + suffix).st_mtime_ns == cached.stamp[0]:
+                    return encoding, suffix
+            except FileNotFoundError:
+                pass
+        if "gzip" in accepted and cached.body is not None:
+            return "gzip", None
+        return None, None
+
+    def send_common_headers(self, etag):
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Cache-Control", "no-cache")
+
+    def log_message(self, format, *args):
+        if not self.server.site.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(site, host="", port=8888, threads=16):
+    server = PooledHTTPServer((host, port), SiteRequestHandler, site, threads)
+    print(f"Serving on http://localhost:{server.server_port}{site.basepath}")
+    return server
+
+
+def run(server):
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped serving")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the built site")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("-p", "--port", type=int, default=8888)
+    parser.add_argument("--host", default="")
+    parser.add_argument("--dir", default=DEST_DIR, help="directory to serve")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=16,
+        help="number of threads handling requests",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="don't log every request",
+    )
+    args = parser.parse_args()
+    site = Site(args.dir, args.basepath, args.quiet)
+    run(make_server(site, args.host, args.port, args.threads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from os import path as path
+import fnmatch
+import functools
+import os
+import re
+
+# directories of unpublished pages, built with --drafts
+DRAFT_PATTERNS = ("_drafts",)
+# dotfiles, editor swap and backup files never make it into the site, a
+# pattern matches a file or directory name or its path from the root
+IGNORE_PATTERNS = (
+    ".*",
+    "*~",
+    "#*#",
+    "*.swp",
+    "*.swo",
+    "*.tmp",
+) + DRAFT_PATTERNS
+
+
+class SiteFile:
+    __slots__ = ("source", "name", "dest", "mtime_ns", "size")
+
+    def __init__(self, source, name, mtime_ns, size, dest=None):
+        # name is relative to the scanned root with "/", dest the output
+        self.source = source
+        self.name = name
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.dest = dest
+
+    @property
+    def stamp(self):
+        return self.mtime_ns, self.size
+
+    def __repr__(self):
+        return f"SiteFile({self.name!r}, {self.source!r}, {self.dest!r})"
+
+
+class SiteIndex:
+    def __init__(self, pages=None, assets=None):
+        # markdown sources and static files, each sorted by name
+        self.pages = pages if pages is not None else []
+        self.assets = assets if assets is not None else []
+
+    @classmethod
+    def scan(cls, content_dir, static_dir=None, dest_dir=None, ignore=IGNORE_PATTERNS):
+        pages = []
+        for f in scan(content_dir, ignore):
+            if not f.name.endswith(".md"):
+                continue
+            if dest_dir is not None:
+                f.dest = output_path(dest_dir, page_output(f.name))
+            pages.append(f)
+        assets = scan(static_dir, ignore) if static_dir else []
+        if dest_dir is not None:
+            for f in assets:
+                f.dest = output_path(dest_dir, f.name)
+        return cls(pages, assets)
+
+    def page_outputs(self):
+        return [(f.source, f.dest) for f in self.pages]
+
+
+def scan(root, ignore=IGNORE_PATTERNS):
+    # one scandir per directory, the stat of every file is kept for the
+    # stages after, e.g. the manifest and the asset hash cache
+    files = []
+    stack = [(root, "")]
+    while stack:
+        dir_path, prefix = stack.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                name = prefix + entry.name
+                if is_ignored_entry(entry.name, name, ignore):
+                    continue
+                if entry.is_dir():
+                    stack.append((entry.path, name + "/"))
+                    continue
+                st = entry.stat()
+                files.append(SiteFile(entry.path, name, st.st_mtime_ns, st.st_size))
+    files.sort(key=lambda f: f.name)
+    return files
+
+
+def is_ignored(name, ignore=IGNORE_PATTERNS):
+    # checks every directory on the way, ignoring one ignores its files
+    parts = name.split("/")
+    for i, part in enumerate(parts):
+        if is_ignored_entry(part, "/".join(parts[: i + 1]), ignore):
+            return True
+    return False
+
+
+def is_ignored_entry(part, name, ignore=IGNORE_PATTERNS):
+    # just the last part of name, for walks that never enter ignored dirs
+    if not ignore:
+        return False
+    match = ignore_regex(tuple(ignore)).match
+    return match(part) is not None or match(name) is not None
+
+
+@functools.lru_cache(maxsize=None)
+def ignore_regex(ignore):
+    # one regex for all the patterns, called for every file of every scan
+    return re.compile("|".join(fnmatch.translate(p) for p in ignore))
+
+
+def ignore_patterns(drafts=False, extra=()):
+    patterns = [p for p in IGNORE_PATTERNS if not drafts or p not in DRAFT_PATTERNS]
+    return tuple(patterns) + tuple(extra)
+
+
+def page_output(name):
+    # only the suffix changes, blog/a.md.md -> blog/a.md.html
+    return name[: -len(".md")] + ".html"
+
+
+def output_path(dest_dir, name):
+    return path.join(dest_dir, *name.split("/"))
@@ -0,0 +1,101 @@
+from os import path as path
+import os
+import re
+from constants import PLACEHOLDER_REGEX, URL_REGEX
+from htmlnode import HTMLNode
+from minify import Minifier, depths_at, minify_html
+
+URL_ATTRIBUTES = ('href="', 'src="')
+
+_cache = {}
+
+
+def rewrite_basepath(html, basepath):
+    if basepath == "/":
+        return html
+    for attr in URL_ATTRIBUTES:
+        html = html.replace(f"{attr}/", f"{attr}{basepath}")
+    return html
+
+
+def rewrite_urls(html, basepath, assets=None):
+    # the basepath rewrite, pointing static files at their fingerprinted names
+    if assets is None:
+        return rewrite_basepath(html, basepath)
+    return re.sub(
+        URL_REGEX, lambda m: m.group(1) + basepath + assets.url(m.group(2)), html
+    )
+
+
+class Template:
+    def __init__(self, source, basepath="/", minify=False, assets=None):
+        self.basepath = basepath
+        self.minify = minify
+        self.assets = assets
+        # the template's own markup is minified once, the values per render
+        self.saved = 0
+        if minify:
+            minified = minify_html(source, strip_indentation=True)
+            self.saved = len(source) - len(minified)
+            source = minified
+        # static text, include marker, placeholder name, static text, ...
+        parts = re.split(PLACEHOLDER_REGEX, source)
+        self.static = [rewrite_urls(p, basepath, assets) for p in parts[::3]]
+        names = parts[2::3]
+        # values in e.g. a template <pre> are kept as they are
+        offsets = [m.start() for m in re.finditer(PLACEHOLDER_REGEX, source)]
+        depths = depths_at(source, offsets) if minify else [0] * len(offsets)
+        is_include = [marker == ">" for marker in parts[1::3]]
+        # placeholders used as a url, e.g. href="{{ Link }}"
+        is_url = [p.endswith(URL_ATTRIBUTES) for p in parts[:-1:3]]
+        self.slots = list(zip(names, is_include, is_url, depths, self.static[1:]))
+        self.includes = [name for name, include, *_ in self.slots if include]
+
+    def iter_render(self, values, partials=None, minifier=None):
+        yield self.static[0]
+        for name, is_include, is_url, depth, static in self.slots:
+            if minifier:
+                minifier.depth = depth
+            if is_include:
+                value = partials.get(name) if partials else None
+            else:
+                value = values.get(name)
+            if value is None:
+                marker = ">" if is_include else ""
+                yield f"{{{{{marker} {name} }}}}"
+            elif isinstance(value, HTMLNode):
+                for chunk in value.iter_html():
+                    chunk = rewrite_urls(chunk, self.basepath, self.assets)
+                    yield minifier.feed(chunk) if minifier else chunk
+            elif is_url and value.startswith("/"):
+                name = self.assets.url(value[1:]) if self.assets else value[1:]
+                yield self.basepath + name
+            else:
+                value = rewrite_urls(value, self.basepath, self.assets)
+                yield minifier.feed(value) if minifier else value
+            yield static
+
+    def render(self, values, partials=None):
+        minifier = Minifier() if self.minify else None
+        return "".join(self.iter_render(values, partials, minifier))
+
+    def render_to(self, stream, values, partials=None):
+        # returns the number of bytes minification saved
+        minifier = Minifier() if self.minify else None
+        for chunk in self.iter_render(values, partials, minifier):
+            stream.write(chunk)
+        return self.saved + minifier.saved if minifier else 0
+
+
+def load_template(template_path, basepath="/", minify=False, assets=None):
+    template_path = path.abspath(template_path)
+    st = os.stat(template_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (template_path, basepath, minify, assets)
+    cached = _cache.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(template_path) as f:
+        template = Template(f.read(), basepath, minify, assets)
+    _cache[key] = (stamp, template)
+    return template
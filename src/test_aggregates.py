@@ -0,0 +1,134 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from os import path as path
+
+import aggregates
+from aggregates import listed_page, render_aggregates, sections, write_aggregates
+from manifest import BuildManifest
+from template import Template
+
+TEMPLATE = Template("<title>{{ Title }}</title>{{ Content }}", "/base/")
+
+
+def summary(title, date=None):
+    return {"title": title, "date": date, "description": ""}
+
+
+class TestAggregates(unittest.TestCase):
+    def test_sections_skip_hand_written_index(self):
+        pages = {
+            "index.html": summary("Home"),
+            "about/index.html": summary("About"),
+            "blog/a/index.html": summary("A", "2024-01-01"),
+            "blog/b.html": summary("B", "2024-02-01"),
+            "docs/index.html": summary("Docs"),
+            "docs/intro/index.html": summary("Intro"),
+        }
+        found = sections(pages)
+        self.assertEqual(list(found), ["blog"])
+        self.assertEqual(
+            [name for name, _ in found["blog"]], ["blog/b.html", "blog/a/index.html"]
+        )
+
+    def test_pagination(self):
+        pages = {
+            f"blog/{i:02}/index.html": summary(f"Post {i}", f"2024-01-{i:02}")
+            for i in range(1, aggregates.PAGE_SIZE + 3)
+        }
+        outputs = render_aggregates(pages, TEMPLATE)
+        self.assertEqual(sorted(outputs), ["blog/index.html", "blog/page/2/index.html"])
+        first = outputs["blog/index.html"]
+        self.assertIn('<a href="/base/blog/page/2/">Older posts</a>', first)
+        self.assertIn("Post 12", first)
+        self.assertNotIn("Post 1<", first)
+        second = outputs["blog/page/2/index.html"]
+        self.assertIn('<a href="/base/blog/">Newer posts</a>', second)
+        self.assertIn("Post 1<", second)
+
+    def test_dates(self):
+        page = listed_page(summary("A", "2024-03-04T10:00:00"), 86400 * 10**9)
+        self.assertEqual((page["date"], page["modified"]), ("2024-03-04", "1970-01-02"))
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            page = listed_page(summary("A", "soon"), 0)
+        self.assertEqual((page["date"], page["modified"]), (None, "1970-01-01"))
+        self.assertIn("invalid date", out.getvalue())
+
+    def test_undated_posts_sort_by_title(self):
+        # mtimes change with a checkout or touch, they never reorder posts
+        pages = {
+            "blog/a.html": listed_page(summary("A"), 0),
+            "blog/b.html": listed_page(summary("B"), 2 * 86400 * 10**9),
+            "blog/c.html": listed_page(summary("C", "2024-01-01"), 0),
+        }
+        html = render_aggregates(pages, TEMPLATE)["blog/index.html"]
+        self.assertLess(html.index(">C<"), html.index(">A<"))
+        self.assertLess(html.index(">A<"), html.index(">B<"))
+        self.assertNotIn("1970", html)
+
+    def test_titles_are_not_markdown(self):
+        pages = {
+            "blog/a.html": summary("Notes [v2] on my_var", "2024-01-01"),
+            "blog/b.html": summary("]", "2024-01-02"),
+            "blog/c.html": summary("<b> & **bold**", "2024-01-03"),
+        }
+        html = render_aggregates(pages, TEMPLATE)["blog/index.html"]
+        self.assertIn('<a href="/base/blog/a.html">Notes [v2] on my_var</a>', html)
+        self.assertIn('<a href="/base/blog/b.html">]</a> (2024-01-02)', html)
+        self.assertIn(">&lt;b&gt; &amp; **bold**</a>", html)
+
+    def test_feed_escapes_titles(self):
+        pages = {"blog/a.html": summary("Fish & Chips", "2024-01-01")}
+        outputs = render_aggregates(pages, TEMPLATE, "/base/", "https://x.org/")
+        self.assertIn("<title>Fish &amp; Chips</title>", outputs["feed.xml"])
+        self.assertIn("<loc>https://x.org/base/blog/</loc>", outputs["sitemap.xml"])
+
+
+class TestWriteAggregates(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.dest = path.join(self.root, "docs")
+        self.manifest = BuildManifest(path.join(self.root, "manifest.json"))
+        self.source = path.join(self.root, "post.md")
+        with open(self.source, "w") as f:
+            f.write("# A")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record(self, name, title):
+        dest = path.join(self.dest, *name.split("/"))
+        self.manifest.record(dest, self.source, "t", "/", {}, summary(title))
+
+    def write(self, site_url=None):
+        changed = write_aggregates(self.manifest, self.dest, TEMPLATE, "/", site_url)
+        return len(changed)
+
+    def test_writes_only_changes(self):
+        self.record("blog/a/index.html", "A")
+        self.assertEqual(self.write("https://x.org"), 3)
+        self.assertEqual(self.write("https://x.org"), 0)
+        self.record("blog/b/index.html", "B")
+        self.assertEqual(self.write("https://x.org"), 3)
+        with open(path.join(self.dest, "blog", "index.html")) as f:
+            self.assertIn(">B</a>", f.read())
+
+    def test_removes_what_is_no_longer_generated(self):
+        self.record("blog/a/index.html", "A")
+        self.write("https://x.org")
+        self.write()
+        self.assertFalse(path.exists(path.join(self.dest, "sitemap.xml")))
+        self.assertTrue(path.exists(path.join(self.dest, "blog", "index.html")))
+        # a hand written index takes over, its output stays
+        self.record("blog/index.html", "Blog")
+        os.makedirs(path.join(self.dest, "blog"), exist_ok=True)
+        self.write()
+        self.assertTrue(path.exists(path.join(self.dest, "blog", "index.html")))
+        self.assertEqual(self.manifest.generated, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
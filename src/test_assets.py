@@ -0,0 +1,69 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from os import path as path
+
+import utils
+from assets import AssetManifest, fingerprinted_name
+from template import Template, rewrite_urls
+
+
+class TestAssetManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = path.join(self.tmp.name, "static")
+        self.docs = path.join(self.tmp.name, "docs")
+        self.write(path.join(self.static, "index.css"), "body {}")
+        self.write(path.join(self.static, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(
+            fingerprinted_name("images/a.png", "3f9a1c2e99"), "images/a.3f9a1c2e.png"
+        )
+
+    def test_hashes_are_cached_by_mtime_and_size(self):
+        hashes = {}
+        first = AssetManifest.build(self.static, hashes)
+        css = path.join(self.static, "index.css")
+        st = os.stat(css)
+        self.write(css, "body {" + "}")
+        os.utime(css, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(AssetManifest.build(self.static, hashes), first)
+        self.write(css, "main {}")
+        changed = AssetManifest.build(self.static, hashes)
+        self.assertNotEqual(changed.url("index.css"), first.url("index.css"))
+        self.assertEqual(changed.url("images/a.png"), first.url("images/a.png"))
+
+    def test_copy_and_rewrite(self):
+        assets = AssetManifest.build(self.static, {})
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.copy_files(self.static, self.docs, names=assets.names)
+        hashed = assets.url("images/a.png")
+        self.assertTrue(path.exists(path.join(self.docs, hashed)))
+        self.assertFalse(path.exists(path.join(self.docs, "images", "a.png")))
+        html = '<img src="/images/a.png"></img><a href="/blog">'
+        self.assertEqual(
+            rewrite_urls(html, "/base/", assets),
+            f'<img src="/base/{hashed}"></img><a href="/base/blog">',
+        )
+        source = '<link href="/index.css" /><a href="{{ Url }}">'
+        template = Template(source, "/", assets=assets)
+        css = assets.url("index.css")
+        self.assertEqual(
+            template.render({"Url": "/index.css"}),
+            f'<link href="/{css}" /><a href="/{css}">',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,18 @@
+import unittest
+
+from benchmark import SHAPES, synthetic_page
+from inline_markdown import extract_title
+from markdown_block import markdown_to_html_node
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+    def test_every_shape_renders(self):
+        for shape in SHAPES:
+            with self.subTest(shape=shape):
+                md = synthetic_page(7, shape, size=2)
+                self.assertEqual(extract_title(md), "Page 7")
+                self.assertTrue(markdown_to_html_node(md).to_html())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import images
+from block_cache import BlockCache
+from images import ImageSizes
+from markdown_block import markdown_to_document
+from test_data import IMAGES_LINKS
+
+
+class TestBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cached_render_matches(self):
+        cache = BlockCache(self.cache_dir)
+        plain = markdown_to_document(IMAGES_LINKS)
+        cold = markdown_to_document(IMAGES_LINKS, cache=cache)
+        warm = markdown_to_document(IMAGES_LINKS, cache=cache)
+        for doc in [cold, warm]:
+            self.assertEqual(doc.root.to_html(), plain.root.to_html())
+            self.assertEqual(doc.title, plain.title)
+            self.assertEqual(doc.links, plain.links)
+            self.assertEqual(doc.images, plain.images)
+            self.assertEqual(doc.text_length, plain.text_length)
+        self.assertEqual(cache.hits, cache.misses)
+
+    def test_image_sizes_are_part_of_the_key(self):
+        cache = BlockCache(self.cache_dir)
+        markdown_to_document("![a](/a.png)", cache=cache)
+        images.use(ImageSizes({"a.png": (1, 2)}))
+        try:
+            html = markdown_to_document("![a](/a.png)", cache=cache).root.to_html()
+        finally:
+            images.use(None)
+        self.assertEqual(cache.hits, 0)
+        self.assertIn('width="1" height="2"', html)
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_entries=2)
+        cache.put(b"a", ("a", None))
+        cache.put(b"b", ("b", None))
+        cache.get(b"a")
+        cache.put(b"c", ("c", None))
+        self.assertEqual(list(cache.entries), [b"a", b"c"])
+
+    def test_save_load_and_clear(self):
+        cache = BlockCache(self.cache_dir)
+        markdown_to_document(IMAGES_LINKS, cache=cache)
+        cache.save()
+        loaded = BlockCache.load(self.cache_dir)
+        self.assertEqual(loaded.entries, cache.entries)
+        loaded.clear()
+        self.assertEqual(len(BlockCache.load(self.cache_dir).entries), 0)
+
+    def test_drain_and_merge(self):
+        worker = BlockCache()
+        markdown_to_document(IMAGES_LINKS, cache=worker)
+        parent = BlockCache()
+        parent.merge(worker.drain())
+        self.assertEqual(parent.entries, worker.entries)
+        self.assertEqual(parent.misses, 5)
+        self.assertEqual(worker.misses, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import contextlib
+import io
+import os
+import struct
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from os import path as path
+
+import utils
+from build import DictSource, DirSource, build, open_sink
+
+TEMPLATE = '<title>{{ Title }}</title><link href="/index.css" />{{ Content }}'
+CONTENT = {
+    "index.md": "# Home\n\nSee [blog](/blog/a/) and ![logo](/images/logo.png)",
+    "blog/a/index.md": "# A\n\n{{> footer }}",
+    "notes.txt": "not a page",
+}
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", 40, 20)
+
+
+class TestBuild(unittest.TestCase):
+    def build(self, content=CONTENT, **kwargs):
+        kwargs.setdefault("partials", DictSource({"footer.md": "**bye**"}))
+        with contextlib.redirect_stdout(io.StringIO()):
+            return build(DictSource(content), TEMPLATE, **kwargs)
+
+    def test_returns_pages(self):
+        files = self.build(basepath="/base/")
+        self.assertEqual(
+            sorted(files), ["blog/a/index.html", "blog/index.html", "index.html"]
+        )
+        self.assertIn(b'href="/base/index.css"', files["index.html"])
+        self.assertIn(b'<a href="/base/blog/a/">A</a>', files["blog/index.html"])
+        self.assertIn(b"<b>bye</b>", files["blog/a/index.html"])
+
+    def test_matches_generate_page_recursive(self):
+        content = {"index.md": "# Home\n\n**bold**", "about/index.md": "# A"}
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, text in content.items():
+                file_path = path.join(tmp, "content", *name.split("/"))
+                os.makedirs(path.dirname(file_path), exist_ok=True)
+                with open(file_path, "w") as f:
+                    f.write(text)
+            with open(path.join(tmp, "template.html"), "w") as f:
+                f.write(TEMPLATE)
+            with contextlib.redirect_stdout(io.StringIO()):
+                utils.generate_page_recursive(
+                    "/base/",
+                    path.join(tmp, "content"),
+                    path.join(tmp, "template.html"),
+                    path.join(tmp, "docs"),
+                )
+            on_disk = DirSource(path.join(tmp, "docs"))
+            expected = {name: on_disk.read(name) for name in on_disk.names()}
+        files = self.build(content, basepath="/base/", partials=None)
+        self.assertEqual(files, expected)
+
+    def test_static_fingerprint_and_image_sizes(self):
+        static = DictSource({"index.css": "body {}", "images/logo.png": PNG})
+        files = self.build(static=static, fingerprint=True)
+        css = [name for name in files if name.endswith(".css")]
+        self.assertEqual(len(css), 1)
+        self.assertNotEqual(css[0], "index.css")
+        self.assertIn("asset-manifest.json", files)
+        self.assertIn(f'href="/{css[0]}"'.encode(), files["index.html"])
+        self.assertIn(b'width="40" height="20"', files["index.html"])
+
+    def test_sitemap_and_feed(self):
+        files = self.build(basepath="/base/", site_url="https://example.com")
+        sitemap = files["sitemap.xml"].decode()
+        self.assertIn("<loc>https://example.com/base/blog/a/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/base/blog/</loc>", sitemap)
+        self.assertIn("<title>Home</title>", files["feed.xml"].decode())
+
+    def test_failure_names_page(self):
+        with self.assertRaises(Exception) as cm:
+            self.build({"broken.md": "no title here"})
+        self.assertIn("broken.md", str(cm.exception))
+
+    def test_archive_sinks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["site.zip", "site.tar.gz"]:
+                archive = path.join(tmp, name)
+                with open_sink(archive) as sink:
+                    self.build(sink=sink)
+                if name.endswith(".zip"):
+                    with zipfile.ZipFile(archive) as z:
+                        names = z.namelist()
+                else:
+                    with tarfile.open(archive) as t:
+                        names = t.getnames()
+                self.assertIn("blog/index.html", names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import contextlib
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from os import path as path
+
+import compress
+import utils
+
+
+class TestCompressOutputs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = path.join(self.tmp.name, "docs")
+        self.page = path.join(self.docs, "blog", "index.html")
+        self.write(self.page, "<p>compress me</p>" * 100)
+        self.write(path.join(self.docs, "small.css"), "body {}")
+        self.write(path.join(self.docs, "image.png"), "x" * 1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def run_compress(self, jobs=1):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            compress.compress_outputs(self.docs, jobs)
+        return out.getvalue()
+
+    def test_writes_gzip_siblings(self):
+        self.assertIn("Compressed 1 files", self.run_compress())
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>compress me</p>" * 100)
+        self.assertFalse(path.exists(path.join(self.docs, "small.css.gz")))
+        self.assertFalse(path.exists(path.join(self.docs, "image.png.gz")))
+
+    def test_only_changed_outputs(self):
+        self.run_compress()
+        self.assertIn("Compressed 0 files", self.run_compress(jobs=2))
+        self.write(self.page, "<p>changed</p>" * 100)
+        self.assertIn("Compressed 1 files", self.run_compress())
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 100)
+
+    def test_removes_siblings_of_removed_files(self):
+        self.run_compress()
+        os.remove(self.page)
+        self.assertIn("1 removed", self.run_compress())
+        self.assertFalse(path.exists(self.page + ".gz"))
+
+    def test_copy_files_keeps_siblings(self):
+        static = path.join(self.tmp.name, "static")
+        self.write(path.join(static, "index.css"), "a {}" * 100)
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.copy_files(static, self.docs, keep=[self.page])
+            self.run_compress()
+            utils.copy_files(
+                static,
+                self.docs,
+                keep=[self.page],
+                keep_siblings=compress.COMPRESSED_SUFFIXES,
+            )
+        self.assertTrue(path.exists(self.page + ".gz"))
+        self.assertTrue(path.exists(path.join(self.docs, "index.css.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from os import path as path
+
+from copy_strategies import COPY_STRATEGIES, copy_file
+
+
+class TestCopyFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = path.join(self.tmp.name, "src.png")
+        self.dst = path.join(self.tmp.name, "dst.png")
+        with open(self.src, "wb") as f:
+            f.write(os.urandom(300_000))
+        os.utime(self.src, ns=(0, 10**9))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, file_path):
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def test_all_strategies_copy_content_and_mtime(self):
+        for strategy in COPY_STRATEGIES:
+            with self.subTest(strategy=strategy):
+                used = copy_file(self.src, self.dst, strategy)
+                self.assertIn(used, COPY_STRATEGIES)
+                self.assertEqual(self.read(self.src), self.read(self.dst))
+                self.assertEqual(os.stat(self.dst).st_mtime_ns, 10**9)
+
+    def test_hardlink_shares_inode(self):
+        self.assertEqual(copy_file(self.src, self.dst, "hardlink"), "hardlink")
+        self.assertTrue(path.samefile(self.src, self.dst))
+
+    def test_copy_over_hardlink_keeps_source(self):
+        copy_file(self.src, self.dst, "hardlink")
+        other = path.join(self.tmp.name, "other.png")
+        with open(other, "wb") as f:
+            f.write(b"other")
+        copy_file(other, self.dst, "copy")
+        self.assertEqual(len(self.read(self.src)), 300_000)
+        self.assertEqual(self.read(self.dst), b"other")
+
+    def test_invalid_strategy(self):
+        with self.assertRaises(ValueError):
+            copy_file(self.src, self.dst, "teleport")
+
+
+if __name__ == "__main__":
+    unittest.main()
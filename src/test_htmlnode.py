@@ -1,3 +1,5 @@
+import io
+import sys
 import unittest
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -21,6 +23,10 @@ class TestHTMLNode(unittest.TestCase):
         node2 = HTMLNode()
         self.assertEqual(node1, node2)
 
+    def test_nodes_have_no_dict(self):
+        for node in [HTMLNode(), LeafNode("b", "x"), ParentNode("p", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
     def test_not_eq(self):
         node1 = HTMLNode(tag="a")
         node2 = HTMLNode(tag="p")
@@ -104,3 +110,24 @@ class TestParentNode(unittest.TestCase):
             parent_node.to_html(),
             '<div>test<div prop="value"></div></div>',
         )
+
+    def test_write_to_stream(self):
+        parent_node = ParentNode(
+            "div", [LeafNode("b", "bold"), ParentNode("p", [LeafNode(None, "text")])]
+        )
+        stream = io.StringIO()
+        parent_node.write_to(stream)
+        self.assertEqual(stream.getvalue(), "<div><b>bold</b><p>text</p></div>")
+
+    def test_write_to_list(self):
+        buffer = []
+        ParentNode("div", [LeafNode("b", "bold")]).write_to(buffer)
+        self.assertEqual(buffer, ["<div>", "<b>bold</b>", "</div>"])
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode(None, "deep")
+        for _ in range(depth):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertEqual(html, "<span>" * depth + "deep" + "</span>" * depth)
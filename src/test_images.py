@@ -0,0 +1,103 @@
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import unittest
+from os import path as path
+
+import images
+from images import ImageSizes, image_size
+from markdown_block import image_salt, markdown_to_html_node
+
+PNG = (
+    b"\x89PNG\r\n\x1a\n"
+    + struct.pack(">I", 13)
+    + b"IHDR"
+    + struct.pack(">II", 640, 480)
+)
+GIF = b"GIF89a" + struct.pack("<HH", 32, 16) + bytes(8)
+WEBP = (
+    b"RIFF\x00\x00\x00\x00WEBPVP8X"
+    + bytes(8)
+    + (99).to_bytes(3, "little")
+    + (49).to_bytes(3, "little")
+)
+JPEG = (
+    b"\xff\xd8\xff\xe0"
+    + struct.pack(">H", 6)
+    + b"JFIF\xff\xc0"
+    + struct.pack(">HBHH", 11, 8, 120, 200)
+    + bytes(4)
+)
+
+
+class TestImageSizes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = path.join(self.tmp.name, "static")
+        os.makedirs(path.join(self.static, "images"))
+        for name, data in [("a.png", PNG), ("b.gif", GIF), ("c.webp", WEBP)]:
+            self.write(name, data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        images.use(None)
+
+    def write(self, name, data):
+        file_path = path.join(self.static, "images", name)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
+
+    def test_formats(self):
+        self.assertEqual(image_size(self.write("a.png", PNG)), (640, 480))
+        self.assertEqual(image_size(self.write("b.gif", GIF)), (32, 16))
+        self.assertEqual(image_size(self.write("c.webp", WEBP)), (100, 50))
+        self.assertEqual(image_size(self.write("d.jpg", JPEG)), (200, 120))
+        with self.assertRaises(ValueError):
+            image_size(self.write("e.png", b"not an image"))
+
+    def test_build_caches_by_mtime_and_size(self):
+        cache = {}
+        sizes = ImageSizes.build(self.static, cache)
+        self.assertEqual(sizes.get("/images/a.png"), (640, 480))
+        self.assertIsNone(sizes.get("https://example.com/images/a.png"))
+        # same size and mtime, the header isn't read again
+        file_path = path.join(self.static, "images", "a.png")
+        st = os.stat(file_path)
+        self.write("a.png", PNG[:-8] + struct.pack(">II", 1, 1))
+        os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(ImageSizes.build(self.static, cache), sizes)
+
+    def test_unreadable_image_warns(self):
+        self.write("broken.png", b"broken")
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            sizes = ImageSizes.build(self.static, {})
+        self.assertIn("broken.png", out.getvalue())
+        self.assertEqual(sizes.missing(["/images/broken.png"]), ["/images/broken.png"])
+
+    def test_rendered_attributes(self):
+        images.use(ImageSizes.build(self.static, {}))
+        html = markdown_to_html_node("![a](/images/a.png)").to_html()
+        self.assertEqual(
+            html,
+            '<div><p><img src="/images/a.png" alt="a" width="640" height="480" '
+            'loading="lazy" decoding="async"></img></p></div>',
+        )
+
+    def test_block_salt_uses_own_images(self):
+        block = "![a](/images/a.png) and ![b](/images/b.gif)"
+        sizes = ImageSizes.build(self.static, {})
+        self.assertEqual(image_salt("no images", sizes), "")
+        salt = image_salt(block, sizes)
+        self.write("d.jpg", JPEG)
+        unrelated = ImageSizes.build(self.static, {})
+        self.assertEqual(image_salt(block, unrelated), salt)
+        self.write("a.png", GIF)
+        resized = ImageSizes.build(self.static, {})
+        self.assertNotEqual(image_salt(block, resized), salt)
+
+
+if __name__ == "__main__":
+    unittest.main()
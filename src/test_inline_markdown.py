@@ -193,6 +193,32 @@ class TestInlineMarkdown(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_keeps_trailing_char(self):
+        nodes = text_to_text_nodes("Contact me [here](/contact).")
+        self.assertListEqual(
+            [
+                TextNode("Contact me ", TextType.TEXT),
+                TextNode("here", TextType.LINK, "/contact"),
+                TextNode(".", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_url_with_underscore(self):
+        nodes = text_to_text_nodes("![alt](/my_image.png) and [a_b](/a_b)")
+        self.assertListEqual(
+            [
+                TextNode("alt", TextType.IMAGE, "/my_image.png"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a_b", TextType.LINK, "/a_b"),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_unpaired(self):
+        with self.assertRaises(ValueError):
+            text_to_text_nodes("This is **unpaired text")
+
     def test_extract_title(self):
         md = """hello this is paragrapgh
 nothing interesting here, BUT HERE
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from os import path as path
+
+from images import ImageSizes
+from manifest import BuildManifest
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.source = path.join(self.root, "content", "index.md")
+        self.dest = path.join(self.root, "docs", "index.html")
+        os.makedirs(path.dirname(self.source))
+        os.makedirs(path.dirname(self.dest))
+        self.write(self.source, "# title")
+        self.write(self.dest, "<h1>title</h1>")
+        self.manifest_path = path.join(self.root, ".build-manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def test_recorded_page_is_fresh(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(self.dest, self.source, "t1", "/")
+        self.assertTrue(manifest.is_fresh(self.dest, self.source, "t1", "/"))
+
+    def test_roundtrip(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(self.dest, self.source, "t1", "/")
+        manifest.save()
+        loaded = BuildManifest.load(self.manifest_path)
+        self.assertEqual(loaded.pages, manifest.pages)
+        self.assertEqual(loaded.outputs(), {self.dest})
+
+    def test_changed_source_is_stale(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(self.dest, self.source, "t1", "/")
+        self.write(self.source, "# other title")
+        self.assertFalse(manifest.is_fresh(self.dest, self.source, "t1", "/"))
+
+    def test_touched_source_is_fresh(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(self.dest, self.source, "t1", "/")
+        st = os.stat(self.source)
+        os.utime(self.source, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertTrue(manifest.is_fresh(self.dest, self.source, "t1", "/"))
+
+    def test_template_and_basepath_invalidate(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(self.dest, self.source, "t1", "/")
+        self.assertFalse(manifest.is_fresh(self.dest, self.source, "t2", "/"))
+        self.assertFalse(manifest.is_fresh(self.dest, self.source, "t1", "/blog/"))
+
+    def test_only_used_image_sizes_invalidate(self):
+        manifest = BuildManifest(self.manifest_path)
+        sizes = ImageSizes({"a.png": (1, 2)})
+        used = sizes.used(["/a.png", "/b.png"])
+        manifest.record(self.dest, self.source, "t1", "/", image_sizes=used)
+        args = self.dest, self.source, "t1", "/"
+        other = ImageSizes({"a.png": (1, 2), "c.png": (3, 4)})
+        self.assertTrue(manifest.is_fresh(*args, image_sizes=other))
+        resized = ImageSizes({"a.png": (2, 2)})
+        self.assertFalse(manifest.is_fresh(*args, image_sizes=resized))
+        added = ImageSizes({"a.png": (1, 2), "b.png": (3, 4)})
+        self.assertFalse(manifest.is_fresh(*args, image_sizes=added))
+
+    def test_missing_output_is_stale(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(self.dest, self.source, "t1", "/")
+        os.remove(self.dest)
+        self.assertFalse(manifest.is_fresh(self.dest, self.source, "t1", "/"))
+
+    def test_remove_stale(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(self.dest, self.source, "t1", "/")
+        removed = manifest.remove_stale([], path.join(self.root, "docs"))
+        self.assertEqual(removed, [self.dest])
+        self.assertFalse(path.exists(self.dest))
+        self.assertEqual(manifest.pages, {})
+
+    def test_load_missing_file(self):
+        manifest = BuildManifest.load(self.manifest_path)
+        self.assertEqual(manifest.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
+import io
 import unittest
 from markdown_block import (
     markdown_to_html_node,
     markdown_to_blocks,
     block_to_block_type,
+    iter_blocks,
+    markdown_to_document,
+    split_front_matter,
     BlockType,
 )
 
@@ -163,6 +167,85 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_code_with_blank_lines(self):
+        md = """
+```python
+def f():
+
+    return 1
+```
+after the code
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><pre><code>def f():\n\n    return 1\n</code></pre>"
+            "<p>after the code</p></div>",
+        )
+
+    def test_iter_blocks_from_file(self):
+        stream = io.StringIO("# title\n\n- a\n- b\n\n1. one\n2. two\n\n> q\ntext\n")
+        self.assertEqual(
+            list(iter_blocks(stream)),
+            [
+                (BlockType.HEADING, "# title"),
+                (BlockType.ULIST, "- a\n- b"),
+                (BlockType.OLIST, "1. one\n2. two"),
+                (BlockType.PARAGRAPH, "> q\ntext"),
+            ],
+        )
+
+    def test_iter_blocks_matches_block_to_block_type(self):
+        md = "# h\n\n> q\n> r\n\npara\ntext\n\n```\ncode\n```\n\n1. a\n3. b"
+        for bt, block in iter_blocks(md.splitlines()):
+            self.assertEqual(bt, block_to_block_type(block))
+
+    def test_fence_ends_paragraph(self):
+        blocks = markdown_to_blocks("text\n```\ncode\n\nmore\n```")
+        self.assertEqual(blocks, ["text", "```\ncode\n\nmore\n```"])
+
+    def test_document_metadata(self):
+        md = """
+# Title
+
+![cover](/images/cover.png)
+
+## Links
+
+Go [home](/) or to the [blog](/blog).
+
+- a [list link](https://example.com)
+
+```
+code
+```
+"""
+        doc = markdown_to_document(md, {"date": "2024-01-01"})
+        self.assertEqual(doc.title, "Title")
+        self.assertEqual(doc.headings, [(1, "Title"), (2, "Links")])
+        self.assertEqual(
+            doc.links,
+            [("home", "/"), ("blog", "/blog"), ("list link", "https://example.com")],
+        )
+        self.assertEqual(doc.images, [("cover", "/images/cover.png")])
+        self.assertEqual(doc.metadata, {"date": "2024-01-01"})
+        self.assertEqual(doc.root.to_html(), markdown_to_html_node(md).to_html())
+        self.assertGreater(doc.text_length, 0)
+
+    def test_document_without_title(self):
+        doc = markdown_to_document("## only h2\n\ntext")
+        self.assertIsNone(doc.title)
+
+    def test_front_matter(self):
+        md = "---\ndate: 2024-01-01\nauthor: Me: Myself\n---\n# title"
+        metadata, body = split_front_matter(md)
+        self.assertEqual(metadata, {"date": "2024-01-01", "author": "Me: Myself"})
+        self.assertEqual(body, "# title")
+
+    def test_no_front_matter(self):
+        md = "# title\n\ntext"
+        self.assertEqual(split_front_matter(md), ({}, md))
+
 
 if __name__ == "__main__":
     unittest.main()
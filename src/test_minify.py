@@ -0,0 +1,56 @@
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from minify import Minifier, minify_html
+from template import Template
+
+
+class TestMinify(unittest.TestCase):
+    def test_strips_comments_and_indentation(self):
+        html = "<!doctype html>\n<html>\n  <!-- nav -->\n  <body> a  b </body>\n</html>"
+        self.assertEqual(
+            minify_html(html, strip_indentation=True),
+            "<!doctype html><html><body> a b </body></html>",
+        )
+
+    def test_preserves_pre_and_code(self):
+        html = "<p>a\n  b</p><pre><code>if x:\n    y  <!-- z --></code></pre><p> c</p>"
+        self.assertEqual(
+            minify_html(html),
+            "<p>a b</p><pre><code>if x:\n    y  <!-- z --></code></pre><p> c</p>",
+        )
+
+    def test_state_carries_across_chunks(self):
+        minifier = Minifier()
+        chunks = ["<pre>", "a\n  b", "</pre>", "c\n  d"]
+        self.assertEqual(
+            "".join(minifier.feed(c) for c in chunks), "<pre>a\n  b</pre>c d"
+        )
+        self.assertEqual(minifier.saved, 2)
+
+    def test_template_render(self):
+        source = "<body>\n  <main>{{ Content }}</main>\n</body>"
+        template = Template(source, minify=True)
+        node = ParentNode(
+            "div",
+            [LeafNode(None, "a  b"), ParentNode("pre", [LeafNode("code", "x\n  y")])],
+        )
+        self.assertEqual(
+            template.render({"Content": node}),
+            "<body><main><div>a b<pre><code>x\n  y</code></pre></div></main></body>",
+        )
+
+    def test_template_placeholder_in_pre(self):
+        source = "<pre>{{ Content }}</pre>\n  <p>{{ Title }}</p>"
+        template = Template(source, minify=True)
+        values = {"Content": "a\n  b", "Title": "x  y"}
+        self.assertEqual(template.render(values), "<pre>a\n  b</pre><p>x y</p>")
+        node = ParentNode("div", [LeafNode(None, "a  b")])
+        self.assertEqual(
+            template.render({"Content": node, "Title": node}),
+            "<pre><div>a  b</div></pre><p><div>a b</div></p>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
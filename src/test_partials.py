@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from os import path as path
+
+import partials
+import utils
+from manifest import BuildManifest
+from markdown_block import markdown_to_document
+from partials import Partials
+
+
+class TestPartials(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.partials_dir = path.join(self.root, "partials")
+        self.write(path.join(self.partials_dir, "nav.md"), "[home](/)")
+        self.write(path.join(self.partials_dir, "footer.html"), "<footer></footer>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def test_load_renders_markdown_and_html(self):
+        loaded = Partials.load(self.partials_dir)
+        self.assertEqual(loaded.get("nav"), '<div><p><a href="/">home</a></p></div>')
+        self.assertEqual(loaded.get("footer"), "<footer></footer>")
+        with self.assertRaises(ValueError):
+            loaded.get("header")
+
+    def test_unchanged_partials_render_once(self):
+        Partials.load(self.partials_dir)
+        rendered = dict(partials._rendered)
+        Partials.load(self.partials_dir)
+        self.assertEqual(partials._rendered, rendered)
+
+    def test_page_include(self):
+        loaded = Partials.load(self.partials_dir)
+        doc = markdown_to_document("# Title\n\n{{> footer }}", partials=loaded)
+        self.assertEqual(doc.includes, ["footer"])
+        html = doc.root.to_html()
+        self.assertEqual(html, "<div><h1>Title</h1><footer></footer></div>")
+
+    def test_partial_edit_only_rebuilds_including_pages(self):
+        content = path.join(self.root, "content")
+        docs = path.join(self.root, "docs")
+        template = path.join(self.root, "template.html")
+        self.write(template, "{{ Content }}")
+        self.write(path.join(content, "a.md"), "# A\n\n{{> nav }}")
+        self.write(path.join(content, "b.md"), "# B")
+        manifest = BuildManifest(path.join(self.root, "manifest.json"))
+
+        def build():
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                utils.generate_page_recursive(
+                    "/", content, template, docs, manifest=manifest
+                )
+            return out.getvalue()
+
+        build()
+        self.write(path.join(self.partials_dir, "nav.md"), "[blog](/blog)")
+        out = build()
+        self.assertIn("a.md", out)
+        self.assertIn("Skipped 1 unchanged pages", out)
+        with open(path.join(docs, "a.html")) as f:
+            self.assertIn('href="/blog"', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from os import path as path
+
+import utils
+from pipeline import render_pages_pipelined
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        self.template = path.join(self.root, "template.html")
+        for i in range(12):
+            self.write(
+                path.join(self.content, f"dir{i % 3}", f"page{i}.md"),
+                f"# Page {i}\n\nSee [home](/) and ![img](/a.png)",
+            )
+        self.write(self.template, TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def build(self, dest, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            utils.generate_page_recursive(
+                "/base/", self.content, self.template, dest, **kwargs
+            )
+        return out.getvalue().replace(dest, "")
+
+    def read_tree(self, root):
+        files = {}
+        for dir_path, _, names in os.walk(root):
+            for name in names:
+                full = path.join(dir_path, name)
+                with open(full) as f:
+                    files[path.relpath(full, root)] = f.read()
+        return files
+
+    def test_matches_sequential_build(self):
+        serial = path.join(self.root, "serial")
+        piped = path.join(self.root, "piped")
+        serial_log = self.build(serial, jobs=1)
+        piped_log = self.build(
+            piped,
+            jobs=3,
+            renderer=lambda *args: render_pages_pipelined(*args, queue_size=2),
+        )
+        self.assertEqual(self.read_tree(serial), self.read_tree(piped))
+        self.assertEqual(serial_log, piped_log)
+
+    def test_failure_names_file(self):
+        self.write(path.join(self.content, "broken.md"), "no title here")
+        with self.assertRaises(Exception) as cm:
+            self.build(path.join(self.root, "out"), renderer=render_pages_pipelined)
+        self.assertIn("broken.md", str(cm.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
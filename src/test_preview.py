@@ -0,0 +1,96 @@
+import contextlib
+import http.client
+import io
+import os
+import tempfile
+import threading
+import unittest
+from os import path as path
+
+from preview import PreviewSite
+from serve import make_server
+
+
+class TestPreview(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = path.join(root, "content")
+        self.docs = path.join(root, "docs")
+        self.write(path.join(self.content, "index.md"), "# Home\n\n[blog](/blog)")
+        self.write(path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(path.join(self.content, "broken.md"), "no title")
+        self.write(path.join(root, "static", "index.css"), "body {}")
+        template = "<title>{{ Title }}</title>{{ Content }}"
+        self.write(path.join(root, "template.html"), template)
+        self.site = PreviewSite(
+            self.content,
+            path.join(root, "static"),
+            path.join(root, "template.html"),
+            "/base/",
+            quiet=True,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def test_renders_on_request(self):
+        page = self.site.lookup("/base/").body.decode()
+        self.assertEqual(
+            page,
+            "<title>Home</title>"
+            '<div><h1>Home</h1><p><a href="/base/blog">blog</a></p></div>',
+        )
+        self.assertEqual(self.site.lookup("/base/blog"), "/base/blog/")
+        blog = self.site.lookup("/base/blog/index.html")
+        self.assertIn(b"<h1>Blog</h1>", blog.body)
+        self.assertEqual(self.site.lookup("/base/index.css").body, b"body {}")
+        self.assertIsNone(self.site.lookup("/base/missing/"))
+        self.assertFalse(path.exists(self.docs))
+
+    def test_section_index(self):
+        for name in ["a", "b"]:
+            self.write(path.join(self.content, "posts", name, "index.md"), f"# {name}")
+        self.assertEqual(self.site.lookup("/base/posts"), "/base/posts/")
+        page = self.site.lookup("/base/posts/")
+        self.assertIn(b'<a href="/base/posts/a/">a</a>', page.body)
+        self.assertIs(self.site.lookup("/base/posts/"), page)
+        self.write(path.join(self.content, "posts", "c", "index.md"), "# [c]")
+        self.assertIn(b">[c]</a>", self.site.lookup("/base/posts/").body)
+        self.assertIsNone(self.site.lookup("/base/posts/page/2/"))
+
+    def test_cached_until_source_changes(self):
+        first = self.site.lookup("/base/")
+        self.assertIs(self.site.lookup("/base/"), first)
+        source = path.join(self.content, "index.md")
+        self.write(source, "# Changed home")
+        os.utime(source, ns=(0, 10**9))
+        self.assertIn(b"Changed home", self.site.lookup("/base/").body)
+
+    def test_memory_is_bounded(self):
+        self.site.pages.max_bytes = 1
+        self.site.lookup("/base/")
+        self.site.lookup("/base/blog/")
+        self.assertEqual(len(self.site.pages.files), 1)
+
+    def test_render_error_is_a_server_error(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            server = make_server(self.site, "127.0.0.1", 0, threads=2)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            conn = http.client.HTTPConnection(*server.server_address)
+            conn.request("GET", "/base/broken.html")
+            self.assertEqual(conn.getresponse().status, 500)
+            conn.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiler
+import utils
+
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_disabled_records_nothing(self):
+        with profiler.stage("read", "a.md"):
+            pass
+        self.assertFalse(profiler.is_enabled())
+
+    def test_stage_summary(self):
+        active = profiler.enable()
+        for page in ["a.md", "b.md"]:
+            with profiler.stage("read", page):
+                pass
+        with profiler.stage("discover"):
+            pass
+        self.assertEqual(len(active.stage_totals()["read"]), 2)
+        summary = active.summary(slowest=1)
+        self.assertIn("discover", summary)
+        self.assertIn("slowest 1 pages:", summary)
+
+    def test_collecting_is_isolated(self):
+        active = profiler.enable()
+        with profiler.stage("discover"):
+            pass
+        with profiler.collecting() as collected:
+            with profiler.stage("read", "a.md"):
+                pass
+        self.assertEqual([e[0] for e in collected.events], ["read"])
+        self.assertEqual([e[0] for e in active.events], ["discover"])
+
+    def test_write_trace(self):
+        active = profiler.enable()
+        with profiler.stage("read", "a.md"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_path = os.path.join(tmp, "trace.json")
+            active.write_trace(trace_path)
+            with open(trace_path) as f:
+                events = json.load(f)["traceEvents"]
+        self.assertEqual(events[0]["name"], "read")
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertEqual(events[0]["args"], {"page": "a.md"})
+
+    def test_streamed_page_stages(self):
+        active = profiler.enable()
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "a.md")
+            with open(source, "w") as f:
+                f.write("text\n# Title\n")
+            with open(source) as f:
+                doc, _ = utils.parse_document(source, f)
+        self.assertEqual(doc.title, "Title")
+        stages = active.stage_totals()
+        for name in ["read", "markdown_to_document", "extract_title"]:
+            self.assertEqual(len(stages[name]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import contextlib
+import gzip
+import http.client
+import io
+import os
+import tempfile
+import threading
+import unittest
+from os import path as path
+
+from serve import Site, make_server
+
+PAGE = "<p>hello</p>" * 100
+
+
+class TestServe(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = path.join(self.tmp.name, "docs")
+        self.write("blog/index.html", PAGE)
+        self.write("images/a.png", "png")
+        self.write("secret.txt", "secret")
+        with contextlib.redirect_stdout(io.StringIO()):
+            site = Site(self.root, "/base/", quiet=True)
+            self.server = make_server(site, "127.0.0.1", 0, threads=4)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        file_path = path.join(self.root, name)
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+        return file_path
+
+    def get(self, url, **headers):
+        conn = http.client.HTTPConnection(*self.server.server_address)
+        conn.request("GET", url, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        return response, body
+
+    def test_etag_and_not_modified(self):
+        response, body = self.get("/base/blog/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body.decode(), PAGE)
+        etag = response.getheader("ETag")
+        response, body = self.get("/base/blog/", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(body, b"")
+        self.write("blog/index.html", "<p>changed</p>")
+        response, _ = self.get("/base/blog/", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+
+    def test_gzip(self):
+        response, body = self.get("/base/blog/", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(gzip.decompress(body).decode(), PAGE)
+        response, body = self.get("/base/images/a.png", **{"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"png")
+
+    def test_precompressed_sibling(self):
+        page = path.join(self.root, "blog", "index.html")
+        with open(page + ".gz", "wb") as f:
+            f.write(gzip.compress(b"precompressed"))
+        st = os.stat(page)
+        os.utime(page + ".gz", ns=(st.st_atime_ns, st.st_mtime_ns))
+        _, body = self.get("/base/blog/index.html", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(gzip.decompress(body), b"precompressed")
+
+    def test_redirects_and_not_found(self):
+        response, _ = self.get("/base/blog")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/base/blog/")
+        self.assertEqual(self.get("/base/missing.html")[0].status, 404)
+        self.assertEqual(self.get("/blog/")[0].status, 404)
+        self.assertEqual(self.get("/base/%2e%2e/%2e%2e/etc/passwd")[0].status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from os import path as path
+
+from site_index import SiteIndex, ignore_patterns, is_ignored, scan
+from utils import find_pages
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        for name in [
+            "index.md",
+            "blog/content/index.md",
+            "blog/a.md.md",
+            "blog/notes.txt",
+            "blog/.index.md.swp",
+            "blog/index.md~",
+            ".git/HEAD",
+            "_drafts/wip.md",
+        ]:
+            file_path = path.join(self.content, *name.split("/"))
+            os.makedirs(path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w") as f:
+                f.write(name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_skips_ignored(self):
+        names = [f.name for f in scan(self.content)]
+        self.assertEqual(
+            names,
+            ["blog/a.md.md", "blog/content/index.md", "blog/notes.txt", "index.md"],
+        )
+
+    def test_scan_keeps_stat(self):
+        f = scan(self.content)[-1]
+        st = os.stat(f.source)
+        self.assertEqual(f.stamp, (st.st_mtime_ns, st.st_size))
+
+    def test_structural_output_paths(self):
+        docs = path.join(self.root, "docs")
+        pages = dict(find_pages(self.content, docs))
+        self.assertEqual(
+            sorted(path.relpath(dest, docs) for dest in pages.values()),
+            [
+                path.join("blog", "a.md.html"),
+                path.join("blog", "content", "index.html"),
+                "index.html",
+            ],
+        )
+
+    def test_drafts(self):
+        ignore = ignore_patterns(drafts=True)
+        index = SiteIndex.scan(self.content, ignore=ignore)
+        self.assertIn("_drafts/wip.md", [f.name for f in index.pages])
+
+    def test_patterns_match_paths(self):
+        ignore = ignore_patterns(extra=["blog/*.txt"])
+        self.assertTrue(is_ignored("blog/notes.txt", ignore))
+        self.assertFalse(is_ignored("notes.txt", ignore))
+        self.assertTrue(is_ignored("a/.hidden/b.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
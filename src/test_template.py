@@ -0,0 +1,53 @@
+import unittest
+
+from template import Template, rewrite_basepath
+
+SOURCE = """<title>{{ Title }}</title>
+<link href="/index.css" />
+<a href="{{ Canonical }}">{{ Author }}</a>
+<article>{{ Content }}</article>"""
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_matches_chained_replace(self):
+        content = '<a href="/blog">blog</a><img src="/images/a.png"></img>'
+        expected = (
+            SOURCE.replace("{{ Title }}", "Home")
+            .replace("{{ Content }}", content)
+            .replace('href="/', 'href="/base/')
+            .replace('src="/', 'src="/base/')
+        )
+        rendered = Template(SOURCE, "/base/").render(
+            {"Title": "Home", "Content": content}
+        )
+        self.assertEqual(rendered, expected)
+
+    def test_metadata_placeholders(self):
+        rendered = Template(SOURCE).render(
+            {"Title": "t", "Content": "c", "Author": "Tolkien"}
+        )
+        self.assertIn(">Tolkien</a>", rendered)
+
+    def test_missing_placeholder_kept(self):
+        rendered = Template(SOURCE).render({"Title": "t", "Content": "c"})
+        self.assertIn(">{{ Author }}</a>", rendered)
+
+    def test_url_placeholder_gets_basepath(self):
+        rendered = Template(SOURCE, "/base/").render({"Canonical": "/blog/tom"})
+        self.assertIn('<a href="/base/blog/tom">', rendered)
+
+    def test_rewrite_basepath_root_is_noop(self):
+        html = '<a href="/x">x</a>'
+        self.assertIs(rewrite_basepath(html, "/"), html)
+
+
+    def test_includes(self):
+        template = Template('{{> nav }}<a href="/">{{ Title }}</a>', "/base/")
+        self.assertEqual(template.includes, ["nav"])
+        rendered = template.render({"Title": "t"}, {"nav": '<a href="/blog">'})
+        self.assertEqual(rendered, '<a href="/base/blog"><a href="/base/">t</a>')
+        self.assertIn("{{> nav }}", template.render({"Title": "t"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,6 +24,11 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("Text", TextType.ITALIC)
         self.assertNotEqual(node, node2)
 
+    def test_repr(self):
+        node = TextNode("Text", TextType.LINK, "https://someurl.com")
+        self.assertEqual(repr(node), "TextNode(Text, link, https://someurl.com)")
+        self.assertFalse(hasattr(node, "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,136 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from os import path as path
+
+import utils
+
+TEMPLATE = '<title>{{ Title }}</title><link href="/index.css" />{{ Content }}'
+
+
+class TestGeneratePageRecursive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        self.template = path.join(self.root, "template.html")
+        for name in ["index", "blog/a/index", "blog/b/index"]:
+            self.write(
+                path.join(self.content, name + ".md"),
+                f"# {name}\n\nSee [home](/) and **{name}**",
+            )
+        self.write(self.template, TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def build(self, dest, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            utils.generate_page_recursive(
+                "/base/", self.content, self.template, dest, **kwargs
+            )
+        return out.getvalue()
+
+    def read_tree(self, root):
+        files = {}
+        for dir_path, _, names in os.walk(root):
+            for name in names:
+                full = path.join(dir_path, name)
+                with open(full, "rb") as f:
+                    files[path.relpath(full, root)] = f.read()
+        return files
+
+    def test_parallel_matches_serial(self):
+        serial = path.join(self.root, "serial")
+        parallel = path.join(self.root, "parallel")
+        serial_log = self.build(serial, jobs=1)
+        parallel_log = self.build(parallel, jobs=2)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+        self.assertEqual(
+            serial_log.replace(serial, ""), parallel_log.replace(parallel, "")
+        )
+
+    def test_parallel_failure_names_file(self):
+        self.write(path.join(self.content, "broken.md"), "no title here")
+        with self.assertRaises(Exception) as cm:
+            self.build(path.join(self.root, "out"), jobs=2)
+        self.assertIn("broken.md", str(cm.exception))
+
+
+class TestParseDocument(unittest.TestCase):
+    def test_lines_match_text(self):
+        text = "---\ndate: 2024-01-01\n---\nintro\n# Glued title\n\n**body**\n"
+        consumed = []
+
+        def lines():
+            for line in text.splitlines(keepends=True):
+                consumed.append(line)
+                yield line
+
+        doc, values = utils.parse_document("a.md", lines())
+        _, expected = utils.parse_document("a.md", text)
+        self.assertEqual(consumed, text.splitlines(keepends=True))
+        self.assertEqual(values["Title"], "Glued title")
+        self.assertEqual(values["date"], "2024-01-01")
+        self.assertEqual(values["Content"].to_html(), expected["Content"].to_html())
+
+
+class TestCopyFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = path.join(self.tmp.name, "static")
+        self.dst = path.join(self.tmp.name, "docs")
+        os.makedirs(path.join(self.src, "images"))
+        for name in ["index.css", "images/a.png"]:
+            with open(path.join(self.src, name), "w") as f:
+                f.write(name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def copy(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            utils.copy_files(self.src, self.dst, **kwargs)
+        return out.getvalue()
+
+    def test_copy_preserves_mtime(self):
+        self.copy()
+        src_stat = os.stat(path.join(self.src, "index.css"))
+        dst_stat = os.stat(path.join(self.dst, "index.css"))
+        self.assertEqual(src_stat.st_mtime_ns, dst_stat.st_mtime_ns)
+
+    def test_skips_unchanged(self):
+        self.copy()
+        out = self.copy()
+        self.assertIn("Copied 0 files", out)
+        self.assertIn("2 unchanged", out)
+
+    def test_checksum_skips_touched(self):
+        self.copy()
+        os.utime(path.join(self.src, "index.css"), ns=(0, 10**9))
+        self.assertIn("Copied 1 files", self.copy())
+        os.utime(path.join(self.src, "index.css"), ns=(0, 2 * 10**9))
+        self.assertIn("Copied 0 files", self.copy(checksum=True))
+
+    def test_removes_orphans_but_keeps_outputs(self):
+        self.copy()
+        output = path.join(self.dst, "blog", "index.html")
+        orphan = path.join(self.dst, "old", "gone.png")
+        for file in [output, orphan]:
+            os.makedirs(path.dirname(file))
+            with open(file, "w") as f:
+                f.write("x")
+        self.copy(keep=[output])
+        self.assertTrue(path.exists(output))
+        self.assertFalse(path.exists(path.dirname(orphan)))
+
+
+if __name__ == "__main__":
+    unittest.main()
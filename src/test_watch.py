@@ -0,0 +1,167 @@
+import contextlib
+import gzip
+import io
+import os
+import struct
+import tempfile
+import unittest
+from os import path as path
+
+import images
+from site_index import IGNORE_PATTERNS
+from watch import DependencyGraph, Watcher, changed_paths, snapshot
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_affected(self):
+        graph = DependencyGraph()
+        graph.add("template.html", "a.md")
+        graph.add("template.html", "b.md")
+        graph.add("a.md", "a.md")
+        self.assertEqual(graph.affected(["a.md"]), {"a.md"})
+        self.assertEqual(graph.affected(["template.html"]), {"a.md", "b.md"})
+        graph.remove_page("a.md")
+        self.assertEqual(graph.affected(["template.html", "a.md"]), {"b.md"})
+
+    def test_changed_paths(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(changed_paths(old, new), {"b", "c", "d"})
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = path.join(root, "content")
+        self.static = path.join(root, "static")
+        self.docs = path.join(root, "docs")
+        self.template = path.join(root, "template.html")
+        self.write(path.join(self.content, "index.md"), "# Home")
+        self.write(path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(path.join(self.static, "index.css"), "body {}")
+        self.write(self.template, "<title>{{ Title }}</title>")
+        self.watcher = Watcher(
+            "/", self.content, self.static, self.template, self.docs
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_path, text):
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+
+    def read(self, file_path):
+        with open(file_path) as f:
+            return f.read()
+
+    def rebuild(self, *changed):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.watcher.rebuild(set(changed))
+        return out.getvalue()
+
+    def test_content_change_rebuilds_one_page(self):
+        source = path.join(self.content, "blog", "index.md")
+        self.write(source, "# New blog")
+        out = self.rebuild(source)
+        self.assertIn("Rebuilt 1 pages", out)
+        html = self.read(path.join(self.docs, "blog", "index.html"))
+        self.assertEqual(html, "<title>New blog</title>")
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.assertIn("Rebuilt 2 pages", self.rebuild(self.template))
+
+    def test_quiet_skips_page_log(self):
+        self.assertIn("Generating page", self.rebuild(self.template))
+        self.watcher.quiet = True
+        out = self.rebuild(self.template)
+        self.assertNotIn("Generating page", out)
+        self.assertIn("Rebuilt 2 pages", out)
+
+    def test_added_and_deleted_pages(self):
+        source = path.join(self.content, "new.md")
+        self.write(source, "# New")
+        self.rebuild(source)
+        self.assertTrue(path.exists(path.join(self.docs, "new.html")))
+        os.remove(source)
+        self.rebuild(source)
+        self.assertFalse(path.exists(path.join(self.docs, "new.html")))
+
+    def test_only_pages_using_an_image_rebuild(self):
+        def png(name, width):
+            with open(path.join(self.static, name), "wb") as f:
+                f.write(PNG + struct.pack(">I4sII", 13, b"IHDR", width, 1))
+            return path.join(self.static, name)
+
+        png("a.png", 1)
+        self.write(self.template, "{{ Content }}")
+        self.write(path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        sizes = images.ImageSizes.build(self.static, {})
+        self.addCleanup(images.use, None)
+        images.use(sizes)
+        self.watcher = Watcher(
+            "/", self.content, self.static, self.template, self.docs, image_sizes=sizes
+        )
+        self.rebuild(self.template)
+        self.assertIn("Rebuilt 0 pages", self.rebuild(png("b.png", 2)))
+        self.assertIn("Rebuilt 1 pages", self.rebuild(png("a.png", 3)))
+        html = self.read(path.join(self.docs, "index.html"))
+        self.assertIn('width="3"', html)
+
+    def test_asset_change_is_copied(self):
+        asset = path.join(self.static, "index.css")
+        self.rebuild(asset)
+        self.assertEqual(self.read(path.join(self.docs, "index.css")), "body {}")
+
+    def test_partial_change_rebuilds_including_pages(self):
+        partial = path.join(path.dirname(self.template), "partials", "nav.md")
+        self.write(partial, "[home](/)")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        source = path.join(self.content, "index.md")
+        self.write(source, "# Home\n\n{{> nav }}")
+        self.rebuild(source, partial, self.template)
+        self.write(partial, "[blog](/blog)")
+        out = self.rebuild(partial)
+        self.assertIn("Rebuilt 1 pages", out)
+        html = self.read(path.join(self.docs, "index.html"))
+        self.assertIn('<a href="/blog">blog</a>', html)
+        self.assertNotIn("home", html)
+
+    def test_compress_refreshes_siblings(self):
+        self.watcher.compress = True
+        source = path.join(self.content, "new.md")
+        page = path.join(self.docs, "new.html")
+        for title in ["first " * 100, "second " * 100]:
+            self.write(source, f"# {title}")
+            self.rebuild(source)
+            with gzip.open(page + ".gz", "rt") as f:
+                self.assertEqual(f.read(), self.read(page))
+        os.remove(source)
+        self.rebuild(source)
+        self.assertFalse(path.exists(page + ".gz"))
+
+    def test_static_tree_is_carried_over_between_polls(self):
+        full = self.watcher.snapshot()
+        css = path.join(self.static, "index.css")
+        self.write(css, "body { color: red }")
+        self.assertEqual(self.watcher.snapshot(full)[css], full[css])
+        self.assertIn(css, changed_paths(full, self.watcher.snapshot()))
+
+    def test_snapshot_lists_files(self):
+        state = snapshot([self.content, self.template])
+        self.assertEqual(len(state), 3)
+
+    def test_snapshot_skips_ignored(self):
+        self.write(path.join(self.content, ".git", "objects", "a"), "x")
+        self.write(path.join(self.content, "blog", "index.md.swp"), "x")
+        state = snapshot([self.content], IGNORE_PATTERNS)
+        self.assertEqual(len(state), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
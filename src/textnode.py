@@ -1,5 +1,6 @@
 from enum import Enum
 from htmlnode import LeafNode
+import images
 
 
 class TextType(Enum):
@@ -12,6 +13,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -41,15 +44,19 @@ def text_node_to_html_node(text_node):
         case TextType.CODE:
             return LeafNode("code", text_node.text)
         case TextType.IMAGE:
-            return LeafNode(
-                "img",
-                "",
-                (
-                    {"src": text_node.url, "alt": text_node.text}
-                    if text_node.url
-                    else None
-                ),
+            props = (
+                {"src": text_node.url, "alt": text_node.text}
+                if text_node.url
+                else None
             )
+            sizes = images.active()
+            if props and sizes:
+                size = sizes.get(text_node.url)
+                if size:
+                    props["width"], props["height"] = size
+                props["loading"] = "lazy"
+                props["decoding"] = "async"
+            return LeafNode("img", "", props)
         case TextType.LINK:
             return LeafNode(
                 "a",
@@ -1,19 +1,32 @@
 from os import path as path
 import os
-import shutil
-from markdown_block import markdown_to_html_node
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from copy_strategies import copy_file
+import profiler
+import block_cache
+import images
+from aggregates import page_summary
+from markdown_block import markdown_to_document, read_front_matter
 from inline_markdown import extract_title
+from manifest import file_digest
+from partials import Partials, partials_dir
+from site_index import IGNORE_PATTERNS, SiteIndex, output_path, scan
+from template import load_template
 
 
-def copy_files(src, dst):
-    def do_recursive(what, all, parent=""):
-        for file in all:
-            p = path.join(parent, file)
-            if path.isdir(p):
-                do_recursive(what, os.listdir(p), parent=p)
-            else:
-                what(p)
-
+def copy_files(
+    src,
+    dst,
+    keep=(),
+    checksum=False,
+    strategy="copy",
+    jobs=1,
+    keep_siblings=(),
+    names=None,
+    files=None,
+):
+    # files is the site index of src, scanned here when not given
     src = path.abspath(src)
     dst = path.abspath(dst)
     if not path.exists(src) or not path.isdir(src):
@@ -21,17 +34,78 @@ def copy_files(src, dst):
 
     if not path.exists(dst):
         os.mkdir(dst)
-    else:
-        do_recursive(os.remove, [dst])
 
-    def copy(file):
-        dst_file = file.replace(src, dst)
-        dir = path.dirname(dst_file)
-        if not path.exists(dir):
-            os.mkdir(dir)
-        shutil.copy(file, dst_file)
+    keep = {path.abspath(p) for p in keep}
+    synced = set()
+    changed = []
+
+    for f in files if files is not None else scan(src):
+        # copied under another name, e.g. a fingerprinted one
+        dst_file = output_path(dst, names.get(f.name, f.name) if names else f.name)
+        synced.add(dst_file)
+        if is_unchanged(f.source, dst_file, checksum, f.stamp):
+            continue
+        os.makedirs(path.dirname(dst_file), exist_ok=True)
+        changed.append((f.source, dst_file))
+
+    def copy(files):
+        start = time.perf_counter()
+        used = copy_file(files[0], files[1], strategy)
+        return used, path.getsize(files[1]), time.perf_counter() - start
+
+    stats = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for used, size, seconds in executor.map(copy, changed):
+            files, total_size, total_seconds = stats.get(used, (0, 0, 0.0))
+            stats[used] = (files + 1, total_size + size, total_seconds + seconds)
+
+    removed = 0
+    for f in scan(dst, ignore=()):
+        if f.source in synced or f.source in keep:
+            continue
+        # e.g. the .gz next to a copied or generated file
+        base, ext = path.splitext(f.source)
+        if ext in keep_siblings and (base in synced or base in keep):
+            continue
+        os.remove(f.source)
+        removed += 1
+    remove_empty_subdirs(dst)
+    print(
+        f"Copied {len(changed)} files from {src} to {dst}, "
+        f"{len(synced) - len(changed)} unchanged, {removed} removed"
+    )
+    for used, (files, size, seconds) in sorted(stats.items()):
+        print(
+            f"  {used:<9} {files:>6} files {size / 2**20:>10.2f} MiB "
+            f"{seconds:>8.3f}s"
+        )
+
+
+def is_unchanged(src_file, dst_file, checksum=False, stamp=None):
+    # stamp is the (mtime, size) of src_file when already known
+    try:
+        dst_stat = os.stat(dst_file)
+    except FileNotFoundError:
+        return False
+    if stamp is None:
+        src_stat = os.stat(src_file)
+        stamp = src_stat.st_mtime_ns, src_stat.st_size
+    mtime_ns, size = stamp
+    if size != dst_stat.st_size:
+        return False
+    if mtime_ns == dst_stat.st_mtime_ns:
+        return True
+    if not checksum or file_digest(src_file) != file_digest(dst_file):
+        return False
+    # same content, align mtimes so the next build takes the fast path
+    os.utime(dst_file, ns=(dst_stat.st_atime_ns, mtime_ns))
+    return True
 
-    do_recursive(copy, [src])
+
+def remove_empty_subdirs(root):
+    for dir_path, _, _ in os.walk(root, topdown=False):
+        if dir_path != root and not os.listdir(dir_path):
+            os.rmdir(dir_path)
 
 
 def generate_page(
@@ -40,29 +114,239 @@ def generate_page(
     template_path,
     dest_path,
 ):
+    log_page(from_path, template_path, dest_path)
+    partials = Partials.load(partials_dir(template_path))
+    write_page(basepath, from_path, template_path, dest_path, partials)
+
+
+def log_page(from_path, template_path, dest_path):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+
+
+def write_page(
+    basepath,
+    from_path,
+    template_path,
+    dest_path,
+    partials=None,
+    minify=False,
+    assets=None,
+):
     from_path = path.abspath(from_path)
     template_path = path.abspath(template_path)
     dest_path = path.abspath(dest_path)
-    with open(from_path) as f:
-        md = f.read()
-    with open(template_path) as f:
-        template = f.read()
-
-    html = markdown_to_html_node(md).to_html()
-    title = extract_title(md)
-    template = (
-        template.replace("{{ Title }}", title)
-        .replace("{{ Content }}", html)
-        .replace('href="/', f'href="{basepath}')
-        .replace('src="/', f'src="{basepath}')
-    )
+    # blocks are parsed as the lines are read, the page is never held whole
+    with open(from_path) as source:
+        template, doc, values = parse_page(
+            basepath, from_path, source, template_path, partials, minify, assets
+        )
 
     if not path.exists(path.dirname(dest_path)):
         os.makedirs(path.dirname(dest_path), exist_ok=True)
 
-    with open(dest_path, "w") as f:
-        f.write(template)
+    # to_html, template substitution and the write are streamed together
+    with profiler.stage("render_write", from_path):
+        with open(dest_path, "w") as f:
+            doc.bytes_saved = template.render_to(f, values, partials)
+    return doc
+
+
+def read_page(from_path):
+    with profiler.stage("read", from_path):
+        with open(from_path) as f:
+            return f.read()
+
+
+def parse_page(
+    basepath,
+    from_path,
+    source,
+    template_path,
+    partials=None,
+    minify=False,
+    assets=None,
+):
+    with profiler.stage("load_template", from_path):
+        template = load_template(template_path, basepath, minify, assets)
+    doc, values = parse_document(from_path, source, partials)
+    # every partial the page depends on
+    doc.includes = sorted(set(template.includes) | set(doc.includes))
+    return template, doc, values
+
+
+def timed_lines(lines, from_path):
+    # the reads of a streamed page are interleaved with its parse, their
+    # time is summed into one "read" event that ends with the last line
+    spent = 0
+    while True:
+        start = time.perf_counter()
+        line = next(lines, None)
+        spent += time.perf_counter() - start
+        if line is None:
+            break
+        yield line
+    end = time.perf_counter()
+    profiler.record("read", from_path, end - spent, end)
+
+
+def parse_document(from_path, source, partials=None):
+    # source is the page's text or an iterator over its lines, e.g. a file.
+    # text was read already, reading the lines counts towards "read"
+    if isinstance(source, str):
+        lines = iter(source.splitlines())
+    elif profiler.is_enabled():
+        lines = timed_lines(iter(source), from_path)
+    else:
+        lines = iter(source)
+    metadata, lines = read_front_matter(lines)
+    # the parse collects the title, fall back to the first "# " line that
+    # isn't a heading block, e.g. one glued to a paragraph
+    title_lines = []
+
+    def scan_title(lines):
+        for line in lines:
+            if not title_lines and line.startswith("# "):
+                title_lines.append(line)
+            yield line
+
+    with profiler.stage("markdown_to_document", from_path):
+        doc = markdown_to_document(
+            scan_title(lines), metadata, block_cache.active(), partials
+        )
+    if doc.title is None:
+        with profiler.stage("extract_title", from_path):
+            doc.title = extract_title("".join(title_lines))
+    return doc, {**metadata, "Title": doc.title, "Content": doc.root}
+
+
+def find_pages(dir_path_content, dest_dir_path, ignore=IGNORE_PATTERNS):
+    index = SiteIndex.scan(dir_path_content, dest_dir=dest_dir_path, ignore=ignore)
+    return index.page_outputs()
+
+
+def warn_missing_images(from_path, doc, image_sizes):
+    for url in image_sizes.missing(url for _, url in doc.images):
+        print(f"Warning: {from_path} uses {url}, which is missing or unreadable")
+
+
+def used_images(doc, image_sizes):
+    if not image_sizes:
+        return None
+    return image_sizes.used(url for _, url in doc.images)
+
+
+def template_digest(template_path, minify=False, assets=None, image_sizes=None):
+    # minified or fingerprinted pages, or ones with image sizes, are another
+    # rendering of the template. the sizes themselves are checked per page
+    digest = file_digest(template_path)
+    if minify:
+        digest += ":minify"
+    if assets:
+        digest += f":assets-{assets.digest}"
+    if image_sizes:
+        digest += ":images"
+    return digest
+
+
+# set in pool worker processes, see init_worker()
+_in_worker = False
+
+
+def init_worker():
+    global _in_worker
+    _in_worker = True
+    # forked workers inherit the parent's cache, only report their own work
+    cache = block_cache.active()
+    if cache:
+        cache.drain()
+
+
+def render_page_task(task):
+    (
+        basepath,
+        from_path,
+        template_path,
+        dest_path,
+        partials,
+        minify,
+        assets,
+        image_sizes,
+        profile,
+        cache_dir,
+    ) = task
+    cache = block_cache.use(cache_dir) if cache_dir else None
+    images.use(image_sizes)
+    # timings and new cache entries are handed back, workers don't share
+    # the parent's profiler and cache
+    with profiler.collecting(profile) as collected:
+        try:
+            doc = write_page(
+                basepath,
+                from_path,
+                template_path,
+                dest_path,
+                partials,
+                minify,
+                assets,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to generate page from {from_path}: {e}") from e
+    # the caller wants what was collected, not the tree
+    doc.root = None
+    events = collected.events if collected else []
+    cache_delta = cache.drain() if cache and _in_worker else None
+    return from_path, dest_path, doc, events, cache_delta
+
+
+def render_pages(
+    basepath,
+    pages,
+    template_path,
+    jobs=1,
+    quiet=False,
+    partials=None,
+    minify=False,
+    assets=None,
+    image_sizes=None,
+):
+    profile = profiler.is_enabled()
+    cache = block_cache.active()
+    cache_dir = cache.cache_dir if cache else None
+    tasks = [
+        (
+            basepath,
+            f,
+            template_path,
+            dest,
+            partials,
+            minify,
+            assets,
+            image_sizes,
+            profile,
+            cache_dir,
+        )
+        for f, dest in pages
+    ]
+    for from_path, dest_path, doc, events, cache_delta in map_tasks(
+        render_page_task, tasks, jobs
+    ):
+        if not quiet:
+            log_page(from_path, template_path, dest_path)
+        if profile:
+            profiler.enable().merge(events)
+        if cache_delta:
+            cache.merge(cache_delta)
+        yield from_path, dest_path, doc
+
+
+def map_tasks(func, tasks, jobs):
+    if jobs <= 1 or len(tasks) < 2:
+        yield from map(func, tasks)
+        return
+    # big chunks keep pickling overhead low, several per worker keep load even
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker) as executor:
+        yield from executor.map(func, tasks, chunksize=chunksize)
 
 
 def generate_page_recursive(
@@ -70,19 +354,74 @@ def generate_page_recursive(
     dir_path_content,
     template_path,
     dest_dir_path,
+    manifest=None,
+    jobs=1,
+    quiet=False,
+    minify=False,
+    assets=None,
+    image_sizes=None,
+    renderer=render_pages,
+    pages=None,
 ):
-    def do_recursive(what, all, parent=""):
-        for file in all:
-            p = path.join(parent, file)
-            if path.isdir(p):
-                do_recursive(what, os.listdir(p), parent=p)
-            else:
-                what(p)
-
-    def generate_file(f):
-        if not f.endswith(".md"):
-            return
-        dest = f.replace(dir_path_content, dest_dir_path).replace(".md", ".html")
-        generate_page(basepath, f, template_path, dest)
-
-    do_recursive(generate_file, [dir_path_content])
+    # pages is the site index's pages, scanned here when not given
+    if pages is None:
+        with profiler.stage("discover"):
+            pages = SiteIndex.scan(dir_path_content, dest_dir=dest_dir_path).pages
+    with profiler.stage("load_partials"):
+        partials = Partials.load(partials_dir(template_path))
+
+    if manifest:
+        with profiler.stage("check_manifest"):
+            template_hash = template_digest(
+                template_path, minify, assets, image_sizes
+            )
+            stale = [
+                (f.source, f.dest)
+                for f in pages
+                if not manifest.is_fresh(
+                    f.dest,
+                    f.source,
+                    template_hash,
+                    basepath,
+                    partials,
+                    f.stamp,
+                    image_sizes,
+                )
+            ]
+    else:
+        stale = [(f.source, f.dest) for f in pages]
+
+    saved = 0
+    for f, dest, doc in renderer(
+        basepath,
+        stale,
+        template_path,
+        jobs,
+        quiet,
+        partials,
+        minify,
+        assets,
+        image_sizes,
+    ):
+        saved += doc.bytes_saved
+        if image_sizes:
+            warn_missing_images(f, doc, image_sizes)
+        if manifest:
+            manifest.record(
+                dest,
+                f,
+                template_hash,
+                basepath,
+                partials.digests(doc.includes),
+                page_summary(doc),
+                used_images(doc, image_sizes),
+            )
+    if minify:
+        print(f"Minified {len(stale)} pages, {saved / 1024:.1f} KiB saved")
+
+    if manifest:
+        seen = [f.dest for f in pages]
+        for dest in manifest.remove_stale(seen, dest_dir_path):
+            print(f"Removed {dest}, its source no longer exists")
+        if len(stale) < len(pages):
+            print(f"Skipped {len(pages) - len(stale)} unchanged pages")
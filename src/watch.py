@@ -0,0 +1,369 @@
+from os import path as path
+import os
+import stat
+import time
+from collections import defaultdict
+import images
+from aggregates import page_summary, write_aggregates
+from assets import AssetManifest
+from compress import compress_file, encodings, is_compressible, remove_siblings
+from copy_strategies import copy_file
+from manifest import remove_empty_dirs
+from partials import Partials, partials_dir
+from site_index import (
+    IGNORE_PATTERNS,
+    SiteIndex,
+    is_ignored,
+    is_ignored_entry,
+    output_path,
+    page_output,
+    scan,
+)
+from template import load_template
+from utils import (
+    log_page,
+    template_digest,
+    used_images,
+    warn_missing_images,
+    write_page,
+)
+
+
+# a poll sleeps at least this many times as long as its last scan took
+SCAN_RATIO = 2
+
+
+def snapshot(paths, ignore=()):
+    # {file: (mtime, size)} below paths, ignored names are never entered.
+    # there is a stat per file, so a scan takes about 20 ms per 1000 files
+    # and changes of big sites take a multiple of that to be seen
+    state = {}
+    stack = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            stack.append((p, ""))
+        else:
+            state[p] = (st.st_mtime_ns, st.st_size)
+    while stack:
+        dir_path, prefix = stack.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    name = prefix + entry.name
+                    if is_ignored_entry(entry.name, name, ignore):
+                        continue
+                    if entry.is_dir():
+                        stack.append((entry.path, name + "/"))
+                        continue
+                    st = entry.stat()
+                    state[entry.path] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            continue
+    return state
+
+
+def changed_paths(old, new):
+    changed = {p for p, stamp in new.items() if old.get(p) != stamp}
+    changed.update(p for p in old if p not in new)
+    return changed
+
+
+class DependencyGraph:
+    def __init__(self):
+        # dependency (a source, the template, ...) -> page sources using it
+        self.dependents = defaultdict(set)
+
+    def add(self, dependency, page):
+        self.dependents[dependency].add(page)
+
+    def remove_page(self, page):
+        for pages in self.dependents.values():
+            pages.discard(page)
+
+    def affected(self, paths):
+        pages = set()
+        for p in paths:
+            pages.update(self.dependents.get(p, ()))
+        return pages
+
+
+class Watcher:
+    def __init__(
+        self,
+        basepath,
+        dir_path_content,
+        static_dir,
+        template_path,
+        dest_dir_path,
+        manifest=None,
+        strategy="copy",
+        interval=0.02,
+        debounce=0.01,
+        static_interval=0.25,
+        minify=False,
+        assets=None,
+        image_sizes=None,
+        ignore=IGNORE_PATTERNS,
+        site_url=None,
+        compress=False,
+        quiet=False,
+    ):
+        self.basepath = basepath
+        self.content_dir = path.abspath(dir_path_content)
+        self.static_dir = path.abspath(static_dir)
+        self.template_path = path.abspath(template_path)
+        self.dest_dir = path.abspath(dest_dir_path)
+        self.manifest = manifest
+        self.strategy = strategy
+        self.interval = interval
+        self.debounce = debounce
+        self.static_interval = static_interval
+        self.minify = minify
+        self.assets = assets
+        self.asset_hashes = manifest.assets if manifest else {}
+        self.image_sizes = image_sizes
+        self.image_cache = manifest.images if manifest else {}
+        self.ignore = ignore
+        self.site_url = site_url
+        self.compress = compress
+        self.quiet = quiet
+        # outputs written or removed by the current rebuild
+        self.outputs = set()
+        self.template_hash = template_digest(
+            self.template_path, minify, assets, image_sizes
+        )
+        self.partials_dir = partials_dir(self.template_path)
+        self.partials = Partials.load(self.partials_dir)
+        self.pages = {}
+        self.graph = DependencyGraph()
+        index = SiteIndex.scan(self.content_dir, dest_dir=self.dest_dir, ignore=ignore)
+        for f in index.pages:
+            self.add_page(f.source, f.dest)
+
+    def add_page(self, source, dest):
+        self.pages[source] = dest
+        self.graph.add(source, source)
+        self.graph.add(self.template_path, source)
+        # partials used by the last build, refined after every render
+        if self.manifest:
+            entry = self.manifest.pages.get(self.manifest.key(dest), {})
+            self.add_includes(source, entry.get("partials", ()))
+            self.add_images(source, entry.get("images", ()))
+
+    def add_includes(self, source, names):
+        # a name resolves to either file, creating the other one matters too
+        for name in names:
+            self.graph.add(path.join(self.partials_dir, name + ".md"), source)
+            self.graph.add(path.join(self.partials_dir, name + ".html"), source)
+
+    def add_images(self, source, urls):
+        # a page depends on the files of its images, not on the whole tree
+        for url in urls:
+            if url.startswith("/"):
+                self.graph.add(output_path(self.static_dir, url[1:]), source)
+
+    def remove_page(self, source):
+        dest = self.pages.pop(source)
+        self.graph.remove_page(source)
+        if self.manifest:
+            self.manifest.pages.pop(self.manifest.key(dest), None)
+        if path.exists(dest):
+            os.remove(dest)
+            self.outputs.add(dest)
+            remove_empty_dirs(path.dirname(dest), self.dest_dir)
+
+    def snapshot(self, previous=None):
+        # the static tree is usually the biggest and its changes the least
+        # urgent, without previous it is polled, else carried over from it
+        roots = [self.content_dir, self.template_path, self.partials_dir]
+        if previous is None:
+            return snapshot(roots + [self.static_dir], self.ignore)
+        state = snapshot(roots, self.ignore)
+        prefix = self.static_dir + os.sep
+        state.update((p, s) for p, s in previous.items() if p.startswith(prefix))
+        return state
+
+    def run(self):
+        print(f"Watching {self.content_dir} and {self.static_dir}, Ctrl+C to stop")
+        start = time.monotonic()
+        state = self.snapshot()
+        scanned = time.monotonic() - start
+        next_static = time.monotonic() + self.static_interval
+        try:
+            while True:
+                # a slow scan mustn't keep the loop busy all the time
+                time.sleep(max(self.interval, SCAN_RATIO * scanned))
+                start = time.monotonic()
+                if start >= next_static:
+                    current = self.snapshot()
+                    next_static = start + self.static_interval
+                else:
+                    current = self.snapshot(state)
+                scanned = time.monotonic() - start
+                changed = changed_paths(state, current)
+                if not changed:
+                    state = current
+                    continue
+                # coalesce a burst of saves into a single rebuild, only once
+                # a change was seen
+                while True:
+                    time.sleep(self.debounce)
+                    latest = self.snapshot(current)
+                    more = changed_paths(current, latest)
+                    if not more:
+                        break
+                    changed |= more
+                    current = latest
+                state = current
+                self.rebuild(changed)
+        except KeyboardInterrupt:
+            print("Stopped watching")
+
+    def rebuild(self, changed):
+        start = time.perf_counter()
+        self.outputs = set()
+        # swap files and the like come and go with every save
+        changed = {p for p in changed if not self.is_ignored(p)}
+        static = sorted(p for p in changed if p.startswith(self.static_dir + os.sep))
+        files = scan(self.static_dir, self.ignore) if static else None
+        previous_assets = self.assets
+        if static and self.assets:
+            self.assets = AssetManifest.build(
+                self.static_dir, self.asset_hashes, files
+            )
+            if self.assets != previous_assets:
+                # every page may reference the renamed files
+                self.outputs.add(self.assets.save(self.dest_dir))
+                changed.add(self.template_path)
+        if static and self.image_sizes:
+            sizes = images.ImageSizes.build(self.static_dir, self.image_cache, files)
+            if sizes != self.image_sizes:
+                self.image_sizes = sizes
+                images.use(sizes)
+        for p in static:
+            self.sync_asset(p, previous_assets)
+
+        for p in sorted(changed):
+            if p.startswith(self.content_dir + os.sep) and p.endswith(".md"):
+                self.sync_page(p)
+            elif p == self.template_path and path.exists(p):
+                self.template_hash = template_digest(
+                    p, self.minify, self.assets, self.image_sizes
+                )
+            elif p.startswith(self.partials_dir + os.sep):
+                self.partials = Partials.load(self.partials_dir)
+
+        pages = sorted(s for s in self.graph.affected(changed) if s in self.pages)
+        for source in pages:
+            dest = self.pages[source]
+            if not self.quiet:
+                log_page(source, self.template_path, dest)
+            try:
+                doc = write_page(
+                    self.basepath,
+                    source,
+                    self.template_path,
+                    dest,
+                    self.partials,
+                    self.minify,
+                    self.assets,
+                )
+            except Exception as e:
+                print(f"Failed to generate page from {source}: {e}")
+                continue
+            self.outputs.add(dest)
+            self.add_includes(source, doc.includes)
+            self.add_images(source, [url for _, url in doc.images])
+            if self.image_sizes:
+                warn_missing_images(source, doc, self.image_sizes)
+            if self.manifest:
+                self.manifest.record(
+                    dest,
+                    source,
+                    self.template_hash,
+                    self.basepath,
+                    self.partials.digests(doc.includes),
+                    page_summary(doc),
+                    used_images(doc, self.image_sizes),
+                )
+
+        if self.manifest:
+            self.update_aggregates()
+        if self.compress:
+            self.compress_outputs()
+        if self.manifest:
+            # a watcher is usually stopped by a signal, nothing runs after
+            self.manifest.save()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        print(
+            f"Rebuilt {len(pages)} pages and {len(static)} assets in {elapsed:.0f} ms"
+        )
+
+    def update_aggregates(self):
+        # section indexes and feeds come from the recorded summaries
+        try:
+            changed = write_aggregates(
+                self.manifest,
+                self.dest_dir,
+                load_template(
+                    self.template_path, self.basepath, self.minify, self.assets
+                ),
+                self.basepath,
+                self.site_url,
+                self.partials,
+            )
+        except Exception as e:
+            print(f"Failed to update section indexes and feeds: {e}")
+            return
+        self.outputs.update(changed)
+
+    def compress_outputs(self):
+        # the .gz and .br siblings of everything this rebuild touched, old
+        # ones would be served in place of the new output
+        suffixes = encodings()
+        for p in sorted(self.outputs):
+            if path.exists(p):
+                if is_compressible(p):
+                    compress_file((p, suffixes))
+            elif remove_siblings(p):
+                remove_empty_dirs(path.dirname(p), self.dest_dir)
+
+    def sync_page(self, source):
+        if not path.exists(source):
+            if source in self.pages:
+                self.remove_page(source)
+        elif source not in self.pages:
+            name = self.name(source, self.content_dir)
+            self.add_page(source, output_path(self.dest_dir, page_output(name)))
+
+    def sync_asset(self, source, previous_assets=None):
+        previous = self.asset_dest(source, previous_assets)
+        dest = self.asset_dest(source, self.assets)
+        if path.exists(previous) and (previous != dest or not path.exists(source)):
+            os.remove(previous)
+            self.outputs.add(previous)
+            remove_empty_dirs(path.dirname(previous), self.dest_dir)
+        if not path.exists(source):
+            return
+        os.makedirs(path.dirname(dest), exist_ok=True)
+        copy_file(source, dest, self.strategy)
+        self.outputs.add(dest)
+
+    def asset_dest(self, source, assets):
+        name = self.name(source, self.static_dir)
+        return output_path(self.dest_dir, assets.url(name) if assets else name)
+
+    def is_ignored(self, p):
+        for root in (self.content_dir, self.static_dir):
+            if p.startswith(root + os.sep):
+                return is_ignored(self.name(p, root), self.ignore)
+        return False
+
+    @staticmethod
+    def name(p, root):
+        return path.relpath(p, root).replace(os.sep, "/")